@@ -129,6 +129,36 @@ MEDIA_ROOT = BASE_DIR / 'media'
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024   # 10MB
 
+# Data mapper import settings
+MAPPER_CHUNK_SIZE = 5000  # rows read and validated at a time
+
+# Parsed uploads are cached here by content hash; set to None to disable
+MAPPER_PARSE_CACHE_DIR = BASE_DIR / 'cache' / 'parsed_files'
+MAPPER_PARSE_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 512MB
+
+# Validate large files on a process pool when set above 1
+MAPPER_PARALLEL_WORKERS = 1
+MAPPER_PARALLEL_PARTITION_BYTES = 8 * 1024 * 1024  # CSV partitions, split by byte offset
+MAPPER_PARALLEL_PARTITION_ROWS = 20000  # Excel and cached partitions, split by rows
+
+# Rows profiled per upload to inform mapping suggestions; 0 profiles the whole file
+MAPPER_PROFILE_SAMPLE_ROWS = 10000
+
+# Processed records stored per result chunk row
+MAPPER_RESULT_CHUNK_SIZE = 1000
+
+# Seconds browsers may reuse the model and schema APIs before revalidating
+MAPPER_SCHEMA_MAX_AGE = 0
+
+# Largest page the results API returns
+MAPPER_API_MAX_PAGE_SIZE = 500
+
+# Records written per bulk_create batch when importing into the target model
+MAPPER_COMMIT_BATCH_SIZE = 1000
+
+# Seconds a process reuses remembered header mappings before reloading them
+MAPPER_MAPPING_MEMORY_TTL = 300
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -1,34 +1,60 @@
+from django.conf import settings
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_http_methods, condition
 from django.apps import apps
 from django.db import models
 import json
+from .importer import BulkImporter
+from .models import UploadSession, SessionResultChunk, MappingProfile
+from .result_store import ResultStore
+from .profiling import ColumnProfiler, MISMATCH_THRESHOLD
+from .schema_registry import SchemaRegistry
 from .utils import ModelIntrospector
+from .validation import ValidationPlan
+from .workflow import UploadWorkflow
+
+
+def _schema_etag(request, *args, **kwargs):
+    """ETag of the schema APIs: the schema version, after an optional refresh"""
+    if request.GET.get('refresh'):
+        SchemaRegistry.clear()
+    return SchemaRegistry.version()
+
+
+def _model_schema_etag(request, model_name):
+    if model_name not in ModelIntrospector.get_all_models():
+        return None
+    return _schema_etag(request)
+
+
+# Clients revalidate with If-None-Match and get a 304 while the schema is unchanged
+schema_cache_control = cache_control(max_age=getattr(settings, 'MAPPER_SCHEMA_MAX_AGE', 0), must_revalidate=True)
 
 
 @require_http_methods(["GET"])
+@schema_cache_control
+@condition(etag_func=_schema_etag)
 def get_available_models(request):
-    """API endpoint to get all available Django models dynamically"""
+    """API endpoint to get all available Django models dynamically
+    
+    ``?refresh=1`` drops the cached schema first so newly registered models
+    and field changes show up.
+    """
     try:
-        all_models = ModelIntrospector.get_all_models()
-        
-        # Filter and format models for API response
+        # Format the models uploads may be imported into
         models_data = {}
-        for model_name, model_class in all_models.items():
-            app_label = model_class._meta.app_label
-            
-            # Skip system models
-            if app_label not in ['admin', 'auth', 'contenttypes', 'sessions', 'messages']:
-                models_data[model_name] = {
-                    'name': model_name,
-                    'app_label': app_label,
-                    'model_name': model_class.__name__,
-                    'verbose_name': model_class._meta.verbose_name,
-                    'verbose_name_plural': model_class._meta.verbose_name_plural,
-                    'table_name': model_class._meta.db_table,
-                    'field_count': len(model_class._meta.get_fields())
-                }
+        for model_name, model_class in SchemaRegistry.import_targets().items():
+            models_data[model_name] = {
+                'name': model_name,
+                'app_label': model_class._meta.app_label,
+                'model_name': model_class.__name__,
+                'verbose_name': model_class._meta.verbose_name,
+                'verbose_name_plural': model_class._meta.verbose_name_plural,
+                'table_name': model_class._meta.db_table,
+                'field_count': len(model_class._meta.get_fields())
+            }
         
         return JsonResponse({
             'success': True,
@@ -44,42 +70,62 @@ def get_available_models(request):
 
 
 @require_http_methods(["GET"])
+@schema_cache_control
+@condition(etag_func=_model_schema_etag)
 def get_model_schema(request, model_name):
     """API endpoint to get detailed schema for a specific model"""
     try:
-        # Get model fields
-        fields_info = ModelIntrospector.get_model_fields(model_name)
+        schema = SchemaRegistry.model_schema(model_name)
         
-        if not fields_info:
+        if not schema or not schema['fields']:
             return JsonResponse({
                 'success': False,
                 'error': f'Model {model_name} not found'
             }, status=404)
         
-        # Get model class for additional metadata
-        all_models = ModelIntrospector.get_all_models()
-        model_class = all_models.get(model_name)
+        return JsonResponse({
+            'success': True,
+            'schema': SchemaRegistry.to_json(schema)
+        })
+        
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+@schema_cache_control
+@condition(etag_func=_schema_etag)
+def get_model_schemas(request):
+    """API endpoint to get the schemas of several import target models at once
+    
+    ``?models=app.Model,app.Other`` picks models and ``?app_label=`` limits
+    them to one app; without either every import target is returned.
+    """
+    try:
+        user_models = SchemaRegistry.import_targets()
+        requested = [name.strip() for name in request.GET.get('models', '').split(',') if name.strip()]
+        app_label = request.GET.get('app_label')
         
-        if not model_class:
+        unknown = [name for name in requested if name not in user_models]
+        if unknown:
             return JsonResponse({
                 'success': False,
-                'error': f'Model {model_name} not found'
+                'error': f'Models not found: {", ".join(unknown)}'
             }, status=404)
         
-        # Prepare schema response
-        schema = {
-            'model_name': model_name,
-            'app_label': model_class._meta.app_label,
-            'verbose_name': model_class._meta.verbose_name,
-            'table_name': model_class._meta.db_table,
-            'fields': fields_info,
-            'required_fields': [name for name, info in fields_info.items() if info.get('required', False)],
-            'optional_fields': [name for name, info in fields_info.items() if not info.get('required', False)]
-        }
+        schemas = {}
+        for model_name in requested or user_models:
+            if app_label and user_models[model_name]._meta.app_label != app_label:
+                continue
+            schemas[model_name] = SchemaRegistry.to_json(SchemaRegistry.model_schema(model_name))
         
         return JsonResponse({
             'success': True,
-            'schema': schema
+            'schemas': schemas,
+            'count': len(schemas)
         })
         
     except Exception as e:
@@ -115,6 +161,7 @@ def validate_mapping(request):
         
         validation_results = {
             'mapping_errors': [],
+            'type_mismatches': [],
             'sample_validation': [],
             'missing_required_fields': [],
             'unmapped_csv_fields': [],
@@ -129,7 +176,10 @@ def validate_mapping(request):
             if required_field not in mapped_model_fields:
                 validation_results['missing_required_fields'].append(required_field)
         
-        # Validate each mapping
+        # Validate each mapping; with the upload's column profiles, also
+        # check that each column's values suit the field they are mapped to
+        column_profiles = _column_profiles(data.get('session_id'))
+        misfit = 0.0
         for csv_field, model_field in field_mappings.items():
             if model_field and model_field not in fields_info:
                 validation_results['mapping_errors'].append({
@@ -137,22 +187,31 @@ def validate_mapping(request):
                     'model_field': model_field,
                     'error': f'Model field {model_field} does not exist'
                 })
+            elif model_field and csv_field in column_profiles:
+                profile = column_profiles[csv_field]
+                fit = ColumnProfiler.field_fit(profile, fields_info[model_field])
+                misfit += 1 - fit
+                if fit < MISMATCH_THRESHOLD:
+                    validation_results['type_mismatches'].append({
+                        'csv_field': csv_field,
+                        'model_field': model_field,
+                        'inferred_type': profile['inferred_type'],
+                        'fit': round(fit, 2)
+                    })
         
         # Validate sample data if provided
         if sample_data:
+            plan = ValidationPlan(field_mappings, fields_info)
             for i, row in enumerate(sample_data[:5]):  # Validate first 5 rows
                 row_errors = []
-                for csv_field, model_field in field_mappings.items():
-                    if model_field and csv_field in row:
-                        field_info = fields_info.get(model_field, {})
-                        is_valid, error_msg, converted_value = ModelIntrospector.validate_field_value(
-                            field_info, row[csv_field]
-                        )
+                for rule in plan.rules:
+                    if rule.csv_field in row:
+                        is_valid, error_msg, converted_value = rule.convert(row[rule.csv_field])
                         if not is_valid:
                             row_errors.append({
-                                'csv_field': csv_field,
-                                'model_field': model_field,
-                                'value': row[csv_field],
+                                'csv_field': rule.csv_field,
+                                'model_field': rule.model_field,
+                                'value': row[rule.csv_field],
                                 'error': error_msg
                             })
                 
@@ -165,7 +224,7 @@ def validate_mapping(request):
         # Calculate validation score
         total_checks = len(field_mappings) + len(required_fields)
         errors_count = len(validation_results['mapping_errors']) + len(validation_results['missing_required_fields'])
-        validation_score = max(0, (total_checks - errors_count) / total_checks * 100) if total_checks > 0 else 0
+        validation_score = max(0, (total_checks - errors_count - misfit) / total_checks * 100) if total_checks > 0 else 0
         
         return JsonResponse({
             'success': True,
@@ -204,35 +263,167 @@ def suggest_mappings(request):
         
         # Generate suggestions using the FieldMapper utility
         from .utils import FieldMapper
-        suggested_mappings = FieldMapper.suggest_mappings(csv_headers, fields_info)
-        
-        # Calculate confidence scores for each suggestion
+        suggested_mappings = FieldMapper.suggest_with_confidence(
+            csv_headers, fields_info, model_name, _column_profiles(request.GET.get('session_id'))
+        )
+
         suggestions_with_confidence = {}
-        for csv_field, model_field in suggested_mappings.items():
+        for csv_field, (model_field, confidence) in suggested_mappings.items():
             if model_field:
-                # Simple confidence calculation based on name similarity
-                csv_lower = csv_field.lower().replace('_', '').replace(' ', '')
-                model_lower = model_field.lower().replace('_', '')
-                
-                if csv_lower == model_lower:
-                    confidence = 100
-                elif csv_lower in model_lower or model_lower in csv_lower:
-                    confidence = 80
-                elif any(word in model_lower for word in csv_lower.split()):
-                    confidence = 60
-                else:
-                    confidence = 40
-                
                 suggestions_with_confidence[csv_field] = {
                     'suggested_field': model_field,
                     'confidence': confidence,
-                    'field_info': fields_info.get(model_field, {})
+                    'field_info': SchemaRegistry.to_json(fields_info.get(model_field, {}))
                 }
         
         return JsonResponse({
             'success': True,
             'suggestions': suggestions_with_confidence,
-            'model_fields': fields_info
+            'model_fields': SchemaRegistry.to_json(fields_info)
+        })
+        
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+def get_mapping_profiles(request):
+    """API endpoint to list the saved mapping profiles"""
+    profiles = [
+        {
+            'name': profile.name,
+            'target_model': profile.target_model,
+            'field_mappings': profile.field_mappings,
+            'import_options': profile.import_options,
+            'updated_at': profile.updated_at
+        }
+        for profile in MappingProfile.objects.all()
+    ]
+    return JsonResponse({
+        'success': True,
+        'profiles': profiles,
+        'count': len(profiles)
+    })
+
+
+@require_http_methods(["POST"])
+def import_with_profile(request):
+    """API endpoint to upload and process a file with a saved mapping profile
+    
+    Takes a multipart ``file`` and the ``profile`` name; with ``commit=1``
+    the valid records are also imported into the target model. Meant for
+    automated feeds, so no step of the interactive flow is needed. It
+    writes to the target model, so like the other POST views it needs a
+    CSRF token.
+    """
+    if 'file' not in request.FILES or not request.POST.get('profile'):
+        return JsonResponse({
+            'success': False,
+            'error': 'file and profile are required'
+        }, status=400)
+    
+    profile = MappingProfile.objects.filter(name=request.POST['profile']).first()
+    if profile is None:
+        return JsonResponse({
+            'success': False,
+            'error': f"Mapping profile {request.POST['profile']} not found"
+        }, status=404)
+    
+    try:
+        session = UploadWorkflow.start(request.FILES['file'])
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+    
+    try:
+        UploadWorkflow.apply_profile(session, profile)
+        UploadWorkflow.process(session)
+        if request.POST.get('commit'):
+            BulkImporter.commit_session(session)
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e),
+            'session_id': session.id
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e),
+            'session_id': session.id
+        }, status=500)
+    
+    return JsonResponse({
+        'success': True,
+        'session_id': session.id,
+        'target_model': session.target_model,
+        'valid_count': session.valid_count,
+        'invalid_count': session.invalid_count,
+        'import_status': session.import_status,
+        'imported_count': session.imported_count
+    })
+
+
+def _column_profiles(session_id):
+    """Stored column profiles of an upload session, empty when there is none"""
+    if not session_id:
+        return {}
+    try:
+        profiles = UploadSession.objects.filter(id=session_id).values_list('column_profiles', flat=True).first()
+    except (ValueError, TypeError):
+        return {}
+    return profiles or {}
+
+
+@require_http_methods(["GET"])
+def get_session_records(request, session_id):
+    """API endpoint to page through a session's valid records"""
+    return _session_results_page(request, session_id, SessionResultChunk.VALID)
+
+
+@require_http_methods(["GET"])
+def get_session_errors(request, session_id):
+    """API endpoint to page through a session's invalid rows"""
+    return _session_results_page(request, session_id, SessionResultChunk.INVALID)
+
+
+def _session_results_page(request, session_id, kind):
+    """One page of stored results, selected with ``offset`` and ``limit``"""
+    try:
+        try:
+            session = UploadSession.objects.only('valid_count', 'invalid_count').get(pk=session_id)
+        except UploadSession.DoesNotExist:
+            return JsonResponse({
+                'success': False,
+                'error': f'Session {session_id} not found'
+            }, status=404)
+        
+        max_limit = getattr(settings, 'MAPPER_API_MAX_PAGE_SIZE', 500)
+        try:
+            offset = max(int(request.GET.get('offset', 0)), 0)
+            limit = min(max(int(request.GET.get('limit', 50)), 1), max_limit)
+        except ValueError:
+            return JsonResponse({
+                'success': False,
+                'error': 'offset and limit must be integers'
+            }, status=400)
+        
+        total = session.valid_count if kind == SessionResultChunk.VALID else session.invalid_count
+        records = ResultStore.page(session, kind, offset, limit)
+        next_offset = offset + len(records)
+        
+        return JsonResponse({
+            'success': True,
+            'total': total,
+            'offset': offset,
+            'limit': limit,
+            'records': records,
+            'next_offset': next_offset if next_offset < total else None
         })
         
     except Exception as e:
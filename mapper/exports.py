@@ -0,0 +1,116 @@
+import csv
+import json
+import zlib
+from typing import Dict, List, Iterable, Iterator, Any, Optional
+
+from .validation import MULTI_VALUE_SEPARATOR
+
+
+# Encoded output is handed to the response in blocks of about this size
+EXPORT_BLOCK_SIZE = 64 * 1024
+
+EXPORT_FORMATS = ('json', 'ndjson', 'csv')
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+ERROR_CSV_COLUMNS = ['row', 'field', 'value', 'error']
+
+
+class _Echo:
+    """File-like object whose write returns the text, for csv.writer"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+class ResultExporter:
+    """Encodes stored result records incrementally for streamed downloads"""
+
+    @staticmethod
+    def iter_json(records: Iterable[Dict[str, Any]], indent: Optional[int] = None) -> Iterator[bytes]:
+        """Encode records as one JSON array, a block of records at a time"""
+        encoder = json.JSONEncoder(ensure_ascii=False, indent=indent, separators=(',', ': ') if indent else (',', ':'))
+        margin = '\n' + ' ' * indent if indent else ''
+
+        def parts():
+            yield '['
+            empty = True
+            for record in records:
+                yield margin if empty else ',' + margin
+                empty = False
+                text = encoder.encode(record)
+                yield text.replace('\n', margin) if indent else text
+            yield ']' if empty or not indent else '\n]'
+
+        return ResultExporter.blocks(parts())
+
+    @staticmethod
+    def iter_ndjson(records: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+        """Encode records as newline-delimited JSON, one record per line"""
+        encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        return ResultExporter.blocks(encoder.encode(record) + '\n' for record in records)
+
+    @staticmethod
+    def iter_csv(header: List[str], rows: Iterable[List[Any]]) -> Iterator[bytes]:
+        """Encode a header and rows as CSV"""
+        writer = csv.writer(_Echo())
+
+        def parts():
+            yield writer.writerow(header)
+            for row in rows:
+                yield writer.writerow([ResultExporter.csv_cell(value) for value in row])
+
+        return ResultExporter.blocks(parts())
+
+    @staticmethod
+    def csv_cell(value: Any) -> Any:
+        """Flatten a record value for a CSV cell"""
+        if value is None:
+            return ''
+        if isinstance(value, list):
+            # Many-to-many values, in the form they are imported
+            return MULTI_VALUE_SEPARATOR.join(str(item) for item in value)
+        if isinstance(value, dict):
+            return json.dumps(value, ensure_ascii=False)
+        return value
+
+    @staticmethod
+    def valid_rows(records: Iterable[Dict[str, Any]], columns: List[str]) -> Iterator[List[Any]]:
+        """One CSV row per valid record"""
+        for record in records:
+            yield [record.get(column) for column in columns]
+
+    @staticmethod
+    def error_rows(invalid_records: Iterable[Dict[str, Any]]) -> Iterator[List[Any]]:
+        """One CSV row per error of every invalid row"""
+        for invalid_record in invalid_records:
+            for error in invalid_record['errors']:
+                yield [invalid_record['row'], error['field'], error['value'], error['error']]
+
+    @staticmethod
+    def gzip(blocks: Iterable[bytes]) -> Iterator[bytes]:
+        """Compress encoded blocks into a gzip stream as they are produced"""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for block in blocks:
+            compressed = compressor.compress(block)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    @staticmethod
+    def blocks(parts: Iterable[str]) -> Iterator[bytes]:
+        """Join small text parts into encoded blocks of about EXPORT_BLOCK_SIZE"""
+        buffer = []
+        size = 0
+        for part in parts:
+            buffer.append(part)
+            size += len(part)
+            if size >= EXPORT_BLOCK_SIZE:
+                yield ''.join(buffer).encode('utf-8')
+                buffer = []
+                size = 0
+        if buffer:
+            yield ''.join(buffer).encode('utf-8')
@@ -0,0 +1,336 @@
+from datetime import datetime
+from typing import Dict, List, Any, Iterable, Callable, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections, models, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .schema_registry import SchemaRegistry
+
+
+IMPORT_MODE_INSERT = 'insert'
+IMPORT_MODE_UPSERT = 'upsert'
+IMPORT_MODES = (IMPORT_MODE_INSERT, IMPORT_MODE_UPSERT)
+
+
+class BulkImporter:
+    """Writes validated records into a target model with batched bulk_create
+
+    Records are the dicts produced by validation (model field name to
+    converted value). Every batch is written in its own transaction, and
+    ``on_batch(batch_number, imported_count)`` is called after each one
+    so callers can record progress.
+
+    In ``upsert`` mode rows whose key fields match an existing row update
+    it instead of inserting a new one. Backends that support
+    ``ON CONFLICT ... DO UPDATE`` do this in the bulk insert itself;
+    elsewhere each batch looks up its existing keys with one ``IN`` query
+    and is split into a ``bulk_create`` and a ``bulk_update``.
+
+    Many-to-many values (lists of related primary keys) are linked after
+    each batch is written, with one ``bulk_create`` on the relation's
+    through model per field. In ``upsert`` mode the existing links of the
+    written rows are replaced.
+    """
+
+    def __init__(self, target_model: str, batch_size: Optional[int] = None,
+                 on_batch: Optional[Callable[[int, int], None]] = None,
+                 mode: str = IMPORT_MODE_INSERT, key_fields: Optional[List[str]] = None):
+        self.model = SchemaRegistry.import_targets().get(target_model)
+        if self.model is None:
+            raise ValueError(f"Cannot import into {target_model}")
+        self.key_fields = self.key_fields_for(self.model, mode, key_fields)
+        self.batch_size = batch_size or getattr(settings, 'MAPPER_COMMIT_BATCH_SIZE', 1000)
+        self.on_batch = on_batch
+        self.mode = mode
+        self.field_writers = self._build_field_writers()
+        self.m2m_fields = {field.name: field for field in self.model._meta.many_to_many}
+
+    @staticmethod
+    def key_fields_for(model, mode: str, key_fields: Optional[List[str]] = None) -> List[str]:
+        """Check an import mode and its key fields; returns the key fields to upsert on
+
+        Key fields must be concrete fields of the model. Backends that
+        upsert with ``ON CONFLICT`` also need them to form a unique key.
+        """
+        if mode not in IMPORT_MODES:
+            raise ValueError(f"Unknown import mode: {mode}")
+        if mode != IMPORT_MODE_UPSERT:
+            return []
+
+        key_fields = list(key_fields or BulkImporter.default_key_fields(model))
+        if not key_fields:
+            raise ValueError(f"{model._meta.label} has no unique fields to upsert on; choose key fields")
+        concrete_fields = {field.name for field in model._meta.concrete_fields}
+        for key_field in key_fields:
+            if key_field not in concrete_fields:
+                raise ValueError(f"Unknown key field: {key_field}")
+
+        connection = connections[router.db_for_write(model)]
+        if connection.features.supports_update_conflicts_with_target and not BulkImporter._is_unique(model, key_fields):
+            raise ValueError(f"Key fields must be unique together: {', '.join(key_fields)}")
+        return key_fields
+
+    @staticmethod
+    def _is_unique(model, field_names: List[str]) -> bool:
+        """Whether the fields are a unique field or the fields of a unique constraint"""
+        names = set(field_names)
+        if len(names) == 1 and model._meta.get_field(field_names[0]).unique:
+            return True
+        unique_sets = list(model._meta.unique_together)
+        unique_sets += [constraint.fields for constraint in model._meta.total_unique_constraints]
+        return any(set(fields) == names for fields in unique_sets)
+
+    @staticmethod
+    def default_key_fields(model) -> List[str]:
+        """The model's first unique field other than the primary key"""
+        for field in model._meta.concrete_fields:
+            if field.unique and not field.primary_key:
+                return [field.name]
+        return []
+
+    def _build_field_writers(self) -> Dict[str, Tuple[str, Callable[[Any], Any]]]:
+        """Map each record key to the model attribute it sets and a value converter"""
+        writers = {}
+        for field in self.model._meta.concrete_fields:
+            if isinstance(field, models.ForeignKey):
+                # Record values for relations are primary keys
+                writers[field.name] = (field.attname, _passthrough)
+            elif isinstance(field, models.DateTimeField):
+                writers[field.name] = (field.attname, _to_datetime)
+            elif isinstance(field, models.DateField):
+                writers[field.name] = (field.attname, _to_date)
+            else:
+                writers[field.name] = (field.attname, _passthrough)
+        return writers
+
+    def build_instance(self, record: Dict[str, Any]) -> models.Model:
+        """Turn a validated record into an unsaved model instance"""
+        values = {}
+        for field_name, value in record.items():
+            writer = self.field_writers.get(field_name)
+            if writer:
+                attname, convert = writer
+                values[attname] = convert(value)
+        return self.model(**values)
+
+    def import_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Insert all records in batches and return how many were written"""
+        imported_count = 0
+        batch_number = 0
+        batch = []
+
+        for record in records:
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                batch_number += 1
+                imported_count += self._write_batch(batch, batch_number)
+                batch = []
+
+        if batch:
+            batch_number += 1
+            imported_count += self._write_batch(batch, batch_number)
+
+        return imported_count
+
+    def _write_batch(self, records: List[Dict[str, Any]], batch_number: int) -> int:
+        try:
+            with transaction.atomic(using=router.db_for_write(self.model)):
+                if self.mode == IMPORT_MODE_UPSERT:
+                    written = self._upsert_batch(records)
+                else:
+                    instances = [self.build_instance(record) for record in records]
+                    self.model.objects.bulk_create(instances, batch_size=self.batch_size)
+                    written = list(zip(instances, records))
+                self._write_links(written)
+        except Exception as e:
+            raise ValueError(f"Error importing batch {batch_number}: {str(e)}")
+
+        if self.on_batch:
+            self.on_batch(batch_number, len(records))
+        return len(records)
+
+    def _upsert_batch(self, records: List[Dict[str, Any]]) -> List[Tuple[models.Model, Dict[str, Any]]]:
+        """Insert new rows and update existing ones, matched on the key fields
+
+        Returns the written instances paired with their records.
+        """
+        # A key repeated within the batch keeps its last row
+        keyed = {}
+        unkeyed = []
+        for record in records:
+            key = tuple(self._key_value(record, key_field) for key_field in self.key_fields)
+            if None in key:
+                unkeyed.append(record)
+            else:
+                keyed[key] = record
+
+        update_fields = [
+            field_name for field_name in dict.fromkeys(name for record in records for name in record)
+            if field_name in self.field_writers and field_name not in self.key_fields
+            and not self.model._meta.get_field(field_name).primary_key
+        ]
+        instances = [self.build_instance(record) for record in keyed.values()]
+        new_instances = [self.build_instance(record) for record in unkeyed]
+        written = list(zip(instances, keyed.values())) + list(zip(new_instances, unkeyed))
+
+        # bulk_update skips pre_save, so refresh auto_now fields by hand
+        for field in self.model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) and update_fields:
+                update_fields.append(field.name)
+                for instance in instances:
+                    field.pre_save(instance, add=False)
+
+        connection = connections[router.db_for_write(self.model)]
+        if instances and connection.features.supports_update_conflicts_with_target:
+            if update_fields:
+                self.model.objects.bulk_create(
+                    instances, batch_size=self.batch_size, update_conflicts=True,
+                    unique_fields=self.key_fields, update_fields=update_fields
+                )
+            else:
+                self.model.objects.bulk_create(instances, batch_size=self.batch_size, ignore_conflicts=True)
+        elif instances:
+            existing = self._existing_keys(list(keyed))
+            to_update = []
+            for key, instance in zip(keyed, instances):
+                if key in existing:
+                    instance.pk = existing[key]
+                    to_update.append(instance)
+                else:
+                    new_instances.append(instance)
+            if to_update and update_fields:
+                self.model.objects.bulk_update(to_update, update_fields, batch_size=self.batch_size)
+
+        if new_instances:
+            self.model.objects.bulk_create(new_instances, batch_size=self.batch_size)
+
+        if self._has_links(records) and any(instance.pk is None for instance in instances):
+            # Conflict-updated rows come back without their primary keys
+            existing = self._existing_keys(list(keyed))
+            for key, instance in zip(keyed, instances):
+                instance.pk = existing.get(key)
+        return written
+
+    def _has_links(self, records: List[Dict[str, Any]]) -> bool:
+        return any(name in record for name in self.m2m_fields for record in records)
+
+    def _write_links(self, written: List[Tuple[models.Model, Dict[str, Any]]]):
+        """Link written rows to their many-to-many values, one query per field"""
+        for name, field in self.m2m_fields.items():
+            linked = [(instance, record[name]) for instance, record in written if name in record]
+            if not linked:
+                continue
+            if any(instance.pk is None for instance, _ in linked):
+                raise ValueError(f"Cannot set {name}: the database did not return the new row ids")
+
+            through = field.remote_field.through
+            source = through._meta.get_field(field.m2m_field_name()).attname
+            target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+            if self.mode == IMPORT_MODE_UPSERT:
+                through._default_manager.filter(
+                    **{f"{source}__in": [instance.pk for instance, _ in linked]}
+                ).delete()
+
+            links = [
+                through(**{source: instance.pk, target: related_pk})
+                for instance, related_pks in linked
+                for related_pk in dict.fromkeys(related_pks or [])
+            ]
+            through._default_manager.bulk_create(links, batch_size=self.batch_size, ignore_conflicts=True)
+
+    def _key_value(self, record: Dict[str, Any], key_field: str) -> Any:
+        """A record's key value in the form the database returns it"""
+        value = record.get(key_field)
+        if value is None:
+            return None
+        return self.field_writers[key_field][1](value)
+
+    def _existing_keys(self, keys: List[Tuple[Any, ...]]) -> Dict[Tuple[Any, ...], Any]:
+        """Fetch the primary keys of rows matching the given keys in one query"""
+        if len(self.key_fields) == 1:
+            condition = Q(**{f"{self.key_fields[0]}__in": [key[0] for key in keys]})
+        else:
+            condition = Q()
+            for key in keys:
+                condition |= Q(**dict(zip(self.key_fields, key)))
+
+        rows = self.model.objects.filter(condition).values_list(*self.key_fields, 'pk')
+        return {tuple(row[:-1]): row[-1] for row in rows}
+
+    @staticmethod
+    def commit_session(session, batch_size: Optional[int] = None) -> int:
+        """Import a processed session's valid records into its target model
+
+        Progress is saved on the session after every batch. Batches that
+        were written stay written if a later batch fails, and committing the
+        failed session again resumes after them. A session that is being
+        imported or was imported already is refused, so its rows are never
+        written twice. Any error marks the import failed and is raised as
+        ValueError.
+        """
+        from .mapping_memory import MappingHistory
+        from .models import SessionResultChunk, UploadSession
+        from .result_store import ResultStore
+
+        def record_progress(batch_number: int, batch_count: int):
+            progress['imported_count'] += batch_count
+            UploadSession.objects.filter(pk=session.pk).update(
+                imported_count=progress['imported_count'], updated_at=timezone.now()
+            )
+
+        # Only one request can move the session out of pending or failed
+        started = UploadSession.objects.filter(
+            pk=session.pk, import_status__in=[UploadSession.IMPORT_PENDING, UploadSession.IMPORT_FAILED]
+        ).update(import_status=UploadSession.IMPORT_RUNNING, import_error='', updated_at=timezone.now())
+        if not started:
+            raise ValueError('This session is being imported or has been imported already')
+        session.import_status = UploadSession.IMPORT_RUNNING
+        session.import_error = ''
+
+        # A failed import resumes after the records its finished batches wrote
+        resume_from = UploadSession.objects.filter(pk=session.pk).values_list('imported_count', flat=True).get()
+        progress = {'imported_count': resume_from}
+
+        try:
+            options = session.import_options or {}
+            importer = BulkImporter(
+                session.target_model, batch_size, on_batch=record_progress,
+                mode=options.get('mode', IMPORT_MODE_INSERT), key_fields=options.get('key_fields')
+            )
+            importer.import_records(ResultStore.iter_records(session, SessionResultChunk.VALID, resume_from))
+        except Exception as e:
+            session.import_status = UploadSession.IMPORT_FAILED
+            session.import_error = str(e)
+            if isinstance(e, ValueError):
+                raise
+            raise ValueError(str(e)) from e
+        else:
+            session.import_status = UploadSession.IMPORT_COMPLETED
+            # The mappings are confirmed now; suggest them for the next upload
+            MappingHistory.remember(session.target_model, session.field_mappings or {})
+        finally:
+            session.imported_count = progress['imported_count']
+            session.save(update_fields=['import_status', 'imported_count', 'import_error', 'updated_at'])
+
+        return session.imported_count
+
+
+def _passthrough(value: Any) -> Any:
+    return value
+
+
+def _to_date(value: Any) -> Any:
+    """Validation stores dates as ISO datetime strings; keep the date part"""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).date()
+    return value
+
+
+def _to_datetime(value: Any) -> Any:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime) and settings.USE_TZ and timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
@@ -0,0 +1,92 @@
+from typing import Dict, List, Any, Iterable, Optional
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.db import models
+
+
+# Values per IN query; keeps large chunks under backend parameter limits
+LOOKUP_BATCH_SIZE = 1000
+
+
+class ForeignKeyLookup:
+    """Resolves raw column values to primary keys of a related model
+
+    Values are matched on one lookup field of the related model. Distinct
+    values are fetched with one ``IN`` query per batch and every answer,
+    including misses, is cached for the lifetime of the lookup (one
+    import), so repeated values never hit the database twice.
+    """
+
+    def __init__(self, related_model: str, lookup_field: Optional[str] = None):
+        self.related_model = related_model
+        self.requested_lookup_field = lookup_field
+        self.cache = {}
+        self._model = None
+        self._field = None
+
+    def __reduce__(self):
+        # Ship the configuration only; the cache stays with this process
+        return ForeignKeyLookup, (self.related_model, self.requested_lookup_field)
+
+    @property
+    def model(self):
+        if self._model is None:
+            app_label, model_name = self.related_model.split('.')
+            self._model = apps.get_model(app_label, model_name)
+        return self._model
+
+    @property
+    def lookup_field(self) -> models.Field:
+        if self._field is None:
+            if self.requested_lookup_field:
+                self._field = self.model._meta.get_field(self.requested_lookup_field)
+            else:
+                self._field = self.default_lookup_field(self.model)
+        return self._field
+
+    @staticmethod
+    def default_lookup_field(model) -> models.Field:
+        """A unique field, else a ``name`` field, else the primary key"""
+        for field in model._meta.concrete_fields:
+            if field.unique and not field.primary_key and not field.is_relation:
+                return field
+        for field in model._meta.concrete_fields:
+            if field.name == 'name':
+                return field
+        return model._meta.pk
+
+    def normalize(self, value: Any) -> Any:
+        """Convert a raw value to the lookup field's type, or None if it cannot be"""
+        if isinstance(value, float) and value.is_integer() and not isinstance(self.lookup_field, models.FloatField):
+            # Spreadsheet cells often hold whole numbers as floats
+            value = int(value)
+        try:
+            return self.lookup_field.to_python(value)
+        except ValidationError:
+            return None
+
+    def resolve(self, values: Iterable[Any]) -> Dict[Any, Any]:
+        """Map each raw value to its related primary key (None when unknown)"""
+        normalized = {value: self.normalize(value) for value in values}
+
+        missing = {key for key in normalized.values() if key is not None and key not in self.cache}
+        if missing:
+            self._fetch(list(missing))
+
+        return {value: self.cache.get(key) if key is not None else None for value, key in normalized.items()}
+
+    def _fetch(self, keys: List[Any]):
+        field_name = self.lookup_field.attname
+        for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+            batch = keys[start:start + LOOKUP_BATCH_SIZE]
+            for key in batch:
+                self.cache[key] = None
+            rows = self.model._default_manager.filter(**{f"{field_name}__in": batch}).order_by('pk').values_list(field_name, 'pk')
+            for key, pk in rows:
+                # Keep the first match when the lookup field is not unique
+                if self.cache.get(key) is None:
+                    self.cache[key] = pk
+
+    def error_message(self, value: Any) -> str:
+        return f"No {self.model._meta.verbose_name} found with {self.lookup_field.name} = {value}"
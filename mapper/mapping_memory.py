@@ -0,0 +1,89 @@
+import time
+from typing import Dict, List, Mapping, Optional
+
+from django.conf import settings
+
+from .matching import FieldMatcher
+from .models import MappingMemory
+
+
+class MappingHistory:
+    """Header-to-field choices remembered from completed imports
+
+    Choices are stored in ``MappingMemory`` per target model and normalized
+    header. Each process keeps the choices of a target model as one plain
+    ``{header_key: model_field}`` dict, loaded with a single query and
+    reloaded after ``MAPPER_MAPPING_MEMORY_TTL`` seconds, so recalling a
+    header is a dict lookup.
+    """
+
+    _cache = {}
+
+    @classmethod
+    def recall(cls, target_model: str, headers: List[str]) -> Dict[str, str]:
+        """Remembered field per header, for the headers that have one"""
+        choices = cls._choices(target_model)
+        if not choices:
+            return {}
+        remembered = {}
+        for header in headers:
+            model_field = choices.get(FieldMatcher.normalize(header))
+            if model_field:
+                remembered[header] = model_field
+        return remembered
+
+    @classmethod
+    def remember(cls, target_model: str, field_mappings: Mapping[str, Optional[str]]):
+        """Store a completed session's choices, replacing earlier ones for the same headers
+
+        Unmapped headers forget any earlier choice rather than being
+        stored, so they are matched afresh next time: a header nobody
+        mapped may just have had no match.
+        """
+        entries = {}
+        unmapped = set()
+        max_length = MappingMemory._meta.get_field('header_key').max_length
+        for header, model_field in field_mappings.items():
+            header_key = FieldMatcher.normalize(header)
+            if not header_key or len(header_key) > max_length:
+                continue
+            if model_field:
+                entries[header_key] = MappingMemory(
+                    target_model=target_model, header_key=header_key, header=str(header)[:255],
+                    model_field=model_field
+                )
+            else:
+                unmapped.add(header_key)
+        # A header mapped under one spelling stays remembered
+        unmapped -= set(entries)
+
+        if unmapped:
+            MappingMemory.objects.filter(target_model=target_model, header_key__in=unmapped).delete()
+        if entries:
+            MappingMemory.objects.bulk_create(
+                entries.values(), update_conflicts=True, unique_fields=['target_model', 'header_key'],
+                update_fields=['header', 'model_field', 'updated_at']
+            )
+
+        cached = cls._cache.get(target_model)
+        if cached is not None:
+            for header_key in unmapped:
+                cached[1].pop(header_key, None)
+            cached[1].update({header_key: entry.model_field for header_key, entry in entries.items()})
+
+    @classmethod
+    def clear(cls):
+        """Drop the in-process cache; choices are reloaded on next use"""
+        cls._cache = {}
+
+    @classmethod
+    def _choices(cls, target_model: str) -> Dict[str, str]:
+        cached = cls._cache.get(target_model)
+        ttl = getattr(settings, 'MAPPER_MAPPING_MEMORY_TTL', 300)
+        if cached is None or time.monotonic() - cached[0] > ttl:
+            choices = dict(
+                MappingMemory.objects.filter(target_model=target_model).exclude(model_field='')
+                .values_list('header_key', 'model_field')
+            )
+            cached = cls._cache[target_model] = (time.monotonic(), choices)
+        return cached[1]
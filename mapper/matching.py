@@ -0,0 +1,179 @@
+import re
+from collections import defaultdict
+from typing import Dict, List, Any, Mapping, Optional, Tuple
+
+from .profiling import ColumnProfiler
+
+
+# Suggestions scoring at or below this are dropped
+MATCH_THRESHOLD = 0.6
+
+# Score of a header equal to a field's name, verbose name or help text
+EXACT_SCORES = {'name': 1.0, 'verbose_name': 1.0, 'help_text': 0.9}
+
+# Share of the header's words found in a field's help text, scaled by this
+HELP_TEXT_WEIGHT = 0.8
+
+# Share of a name score that depends on the column's values fitting the field
+PROFILE_FIT_WEIGHT = 0.25
+
+# Added for a field with choices, scaled by the share of values that are valid choices
+CHOICE_BONUS = 0.2
+
+NGRAM_SIZE = 3
+
+# Name scores remembered per matcher; exports are re-uploaded with the same headers
+MATCH_CACHE_SIZE = 4096
+
+_WORD_PATTERN = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+')
+
+
+class FieldMatcher:
+    """Scores column headers against the fields of one model
+
+    Field names, verbose names and help texts are normalized once into an
+    index of exact forms, words and character n-grams. A header is then
+    scored only against the fields sharing an n-gram or word with it, and
+    the best field comes back with its score. Build one per model
+    (``SchemaRegistry.field_matcher`` caches them) and reuse it; the name
+    scores of each header are remembered too.
+    """
+
+    def __init__(self, model_fields: Mapping[str, Mapping[str, Any]]):
+        self.field_names = list(model_fields)
+        self.field_infos = list(model_fields.values())
+        self.exact = {}
+        self.forms = []
+        self.gram_counts = []
+        self.grams = defaultdict(list)
+        self.words = []
+        self.word_fields = defaultdict(set)
+        self.help_words = defaultdict(set)
+        self.matches = {}
+
+        for position, (field_name, field_info) in enumerate(model_fields.items()):
+            verbose_name = field_info.get('verbose_name') or ''
+            help_text = field_info.get('help_text') or ''
+            for source, text in (('name', field_name), ('verbose_name', verbose_name), ('help_text', help_text)):
+                compact = self.normalize(text)
+                if compact and self.exact.get(compact, (None, 0))[1] < EXACT_SCORES[source]:
+                    self.exact[compact] = (position, EXACT_SCORES[source])
+
+            # Names and verbose names are compared as a whole; help texts
+            # only contribute the words they share with a header
+            forms = tuple(dict.fromkeys(
+                form for form in (self.normalize(field_name), self.normalize(verbose_name)) if form
+            ))
+            self.forms.append(forms)
+            self.gram_counts.append(tuple(len(self.ngrams(form)) for form in forms))
+            for form_position, form in enumerate(forms):
+                for gram in self.ngrams(form):
+                    self.grams[gram].append((position, form_position))
+
+            words = set(self.words_of(field_name)) | set(self.words_of(verbose_name))
+            self.words.append(words)
+            for word in words:
+                self.word_fields[word].add(position)
+            for word in self.words_of(help_text):
+                self.help_words[word].add(position)
+
+    def match(self, header: str, profile: Optional[Mapping[str, Any]] = None) -> Tuple[str, float]:
+        """Best field for a header and its score from 0 to 1; ``''`` and 0 when nothing scores
+
+        With the column's profile (see ``ColumnProfiler``) each candidate's
+        name score is weighted by how well the column's values fit the
+        field, and values that are valid choices of a field count for it.
+        """
+        scores = self.matches.get(header)
+        if scores is None:
+            if len(self.matches) >= MATCH_CACHE_SIZE:
+                self.matches.clear()
+            scores = self.matches[header] = self._name_scores(header)
+
+        if profile:
+            weighted = {}
+            for position, score in scores.items():
+                field_info = self.field_infos[position]
+                fit = ColumnProfiler.field_fit(profile, field_info)
+                score *= 1 - PROFILE_FIT_WEIGHT + PROFILE_FIT_WEIGHT * fit
+                if field_info.get('choices'):
+                    score += CHOICE_BONUS * fit
+                weighted[position] = min(score, 1.0)
+            scores = weighted
+
+        # Ties go to the field declared first
+        best_position = None
+        best_score = MATCH_THRESHOLD
+        for position in sorted(scores):
+            if scores[position] > best_score:
+                best_position = position
+                best_score = scores[position]
+        if best_position is None:
+            return '', 0.0
+        return self.field_names[best_position], best_score
+
+    def _name_scores(self, header: str) -> Dict[int, float]:
+        """Score per candidate field position, from the header's name alone"""
+        header_words = self.words_of(header)
+        compact = ''.join(header_words)
+        if not compact:
+            return {}
+
+        exact = self.exact.get(compact)
+        if exact is not None:
+            return {exact[0]: exact[1]}
+
+        # Shared n-grams per (field, form), from the index
+        header_grams = self.ngrams(compact)
+        shared = {}
+        for gram in header_grams:
+            for entry in self.grams.get(gram, ()):
+                shared[entry] = shared.get(entry, 0) + 1
+
+        scores = {}
+        for (position, form_position), count in shared.items():
+            form = self.forms[position][form_position]
+            score = 2 * count / (len(header_grams) + self.gram_counts[position][form_position])
+            if compact in form or form in compact:
+                score = max(score, min(len(compact), len(form)) / max(len(compact), len(form)))
+            scores[position] = max(scores.get(position, 0.0), score)
+
+        header_word_set = set(header_words)
+        help_hits = {}
+        for word in header_word_set:
+            for position in self.word_fields.get(word, ()):
+                common = len(header_word_set & self.words[position])
+                scores[position] = max(scores.get(position, 0.0),
+                                       2 * common / (len(header_word_set) + len(self.words[position])))
+            for position in self.help_words.get(word, ()):
+                help_hits[position] = help_hits.get(position, 0) + 1
+        for position, hits in help_hits.items():
+            scores[position] = max(scores.get(position, 0.0), HELP_TEXT_WEIGHT * hits / len(header_word_set))
+        return scores
+
+    def match_all(self, headers: List[str],
+                  profiles: Optional[Mapping[str, Mapping[str, Any]]] = None) -> Dict[str, Tuple[str, float]]:
+        """``match()`` for every header, with its profile when ``profiles`` has one"""
+        profiles = profiles or {}
+        return {header: self.match(header, profiles.get(header)) for header in headers}
+
+    @staticmethod
+    def normalize(header: Optional[str]) -> str:
+        """Compact form of a header: its lower-cased words run together"""
+        return ''.join(FieldMatcher.words_of(header))
+
+    @staticmethod
+    def words_of(text: Optional[str]) -> List[str]:
+        """Lower-cased words of a name or label, splitting camelCase and separators"""
+        return [word.lower() for word in _WORD_PATTERN.findall(str(text or ''))]
+
+    @staticmethod
+    def ngrams(form: str) -> set:
+        """Character n-grams of a compact form, padded so short forms still have some"""
+        padded = f"^{form}$"
+        return {padded[start:start + NGRAM_SIZE] for start in range(max(len(padded) - NGRAM_SIZE + 1, 1))}
+
+    @staticmethod
+    def confidence(score: float) -> int:
+        """A match score as a 0-100 confidence"""
+        return int(round(score * 100))
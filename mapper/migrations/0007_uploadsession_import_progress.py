@@ -0,0 +1,28 @@
+# Generated by Django 4.2.24 on 2026-10-16 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mapper', '0006_bus_department_hostel_block_hostel_floor_hostel_room_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='import_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='import_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='imported_count',
+            field=models.IntegerField(default=0, help_text='Records written to the target model so far'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-16 23:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mapper', '0007_uploadsession_import_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='import_options',
+            field=models.JSONField(blank=True, default=dict, help_text='Import mode and key fields'),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 4.2.24 on 2026-10-17 00:06
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+CHUNK_SIZE = 1000
+
+
+def move_results_to_chunks(apps, schema_editor):
+    UploadSession = apps.get_model('mapper', 'UploadSession')
+    SessionResultChunk = apps.get_model('mapper', 'SessionResultChunk')
+    sessions = UploadSession.objects.only('processed_data', 'validation_errors')
+    for session in sessions.iterator(chunk_size=1):
+        chunks = []
+        for kind, records in (('valid', session.processed_data or []), ('invalid', session.validation_errors or [])):
+            for number, first_index in enumerate(range(0, len(records), CHUNK_SIZE)):
+                chunk_records = records[first_index:first_index + CHUNK_SIZE]
+                chunks.append(SessionResultChunk(
+                    session_id=session.pk, kind=kind, number=number, first_index=first_index,
+                    record_count=len(chunk_records), records=chunk_records
+                ))
+        SessionResultChunk.objects.bulk_create(chunks)
+        UploadSession.objects.filter(pk=session.pk).update(
+            valid_count=len(session.processed_data or []),
+            invalid_count=len(session.validation_errors or [])
+        )
+
+
+def move_results_to_session(apps, schema_editor):
+    UploadSession = apps.get_model('mapper', 'UploadSession')
+    SessionResultChunk = apps.get_model('mapper', 'SessionResultChunk')
+    for session in UploadSession.objects.only('pk').iterator():
+        results = {'valid': [], 'invalid': []}
+        chunks = SessionResultChunk.objects.filter(session_id=session.pk).order_by('kind', 'number')
+        for kind, records in chunks.values_list('kind', 'records'):
+            results[kind].extend(records)
+        UploadSession.objects.filter(pk=session.pk).update(
+            processed_data=results['valid'], validation_errors=results['invalid']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mapper', '0008_uploadsession_import_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='invalid_count',
+            field=models.IntegerField(default=0, help_text='Invalid rows in the stored results'),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='valid_count',
+            field=models.IntegerField(default=0, help_text='Valid records in the stored results'),
+        ),
+        migrations.CreateModel(
+            name='SessionResultChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('valid', 'Valid records'), ('invalid', 'Invalid rows')], max_length=10)),
+                ('number', models.IntegerField(help_text='Position of the chunk within its kind')),
+                ('first_index', models.IntegerField(help_text="Index of the chunk's first record within its kind")),
+                ('record_count', models.IntegerField()),
+                ('records', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='result_chunks', to='mapper.uploadsession')),
+            ],
+            options={
+                'ordering': ['session', 'kind', 'number'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='sessionresultchunk',
+            constraint=models.UniqueConstraint(fields=('session', 'kind', 'number'), name='unique_session_result_chunk'),
+        ),
+        migrations.RunPython(move_results_to_chunks, move_results_to_session),
+        migrations.RemoveField(
+            model_name='uploadsession',
+            name='processed_data',
+        ),
+        migrations.RemoveField(
+            model_name='uploadsession',
+            name='validation_errors',
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.24 on 2026-10-17 00:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mapper', '0009_session_result_chunks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MappingMemory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_model', models.CharField(max_length=100)),
+                ('header_key', models.CharField(help_text='Normalized header', max_length=255)),
+                ('header', models.CharField(help_text='Header as last uploaded', max_length=255)),
+                ('model_field', models.CharField(blank=True, max_length=100)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='mappingmemory',
+            constraint=models.UniqueConstraint(fields=('target_model', 'header_key'), name='unique_mapping_memory'),
+        ),
+    ]
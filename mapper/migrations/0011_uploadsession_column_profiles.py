@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-17 00:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mapper', '0010_mapping_memory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='column_profiles',
+            field=models.JSONField(blank=True, default=dict, help_text='Statistics per column of the upload'),
+        ),
+    ]
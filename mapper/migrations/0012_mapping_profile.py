@@ -0,0 +1,28 @@
+# Generated by Django 4.2.24 on 2026-10-17 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mapper', '0011_uploadsession_column_profiles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MappingProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('target_model', models.CharField(max_length=100)),
+                ('field_mappings', models.JSONField(blank=True, default=dict)),
+                ('import_options', models.JSONField(blank=True, default=dict, help_text='Import mode and key fields')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+    ]
@@ -268,40 +268,127 @@ class UserRecord(models.Model):
         verbose_name_plural = "User Records"
 
 
+class UploadSessionQuerySet(models.QuerySet):
+    def with_payloads(self, *fields):
+        """Also load the given payload fields, or all of them when none are named"""
+        fields = fields or UploadSession.PAYLOAD_FIELDS
+        return self.defer(None).defer(*[name for name in UploadSession.PAYLOAD_FIELDS if name not in fields])
+
+
+class UploadSessionManager(models.Manager.from_queryset(UploadSessionQuerySet)):
+    """Leaves the large JSON payloads out of session queries unless asked for
+
+    Views that need them load them with ``with_payloads()``; anything else
+    reading a deferred payload fetches it with one extra query.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().defer(*UploadSession.PAYLOAD_FIELDS)
+
+
 class UploadSession(models.Model):
     """Model to track file upload and mapping sessions"""
+    # File-sized JSON fields that most views never read
+    PAYLOAD_FIELDS = ('preview_data', 'column_profiles')
+
+    IMPORT_PENDING = "pending"
+    IMPORT_RUNNING = "running"
+    IMPORT_COMPLETED = "completed"
+    IMPORT_FAILED = "failed"
+    IMPORT_STATUS_CHOICES = (
+        (IMPORT_PENDING, "Pending"),
+        (IMPORT_RUNNING, "Running"),
+        (IMPORT_COMPLETED, "Completed"),
+        (IMPORT_FAILED, "Failed"),
+    )
+
     file = models.FileField(upload_to='uploads/%Y/%m/%d/')
     original_filename = models.CharField(max_length=255)
     file_type = models.CharField(max_length=10, choices=[('csv', 'CSV'), ('excel', 'Excel')])
     target_model = models.CharField(max_length=100, blank=True, null=True)
     field_mappings = models.JSONField(default=dict, blank=True)
     preview_data = models.JSONField(default=list, blank=True)
-    processed_data = models.JSONField(default=list, blank=True)
-    validation_errors = models.JSONField(default=list, blank=True)
+    column_profiles = models.JSONField(default=dict, blank=True, help_text="Statistics per column of the upload")
+    valid_count = models.IntegerField(default=0, help_text="Valid records in the stored results")
+    invalid_count = models.IntegerField(default=0, help_text="Invalid rows in the stored results")
+    import_options = models.JSONField(default=dict, blank=True, help_text="Import mode and key fields")
+    import_status = models.CharField(max_length=20, choices=IMPORT_STATUS_CHOICES, default=IMPORT_PENDING)
+    imported_count = models.IntegerField(default=0, help_text="Records written to the target model so far")
+    import_error = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = UploadSessionManager()
+    
     def __str__(self):
         return f"{self.original_filename} - {self.created_at}"
     
     class Meta:
         ordering = ['-created_at']
 
-class UploadSession(models.Model):
-    """Model to track file upload and mapping sessions"""
-    file = models.FileField(upload_to='uploads/%Y/%m/%d/')
-    original_filename = models.CharField(max_length=255)
-    file_type = models.CharField(max_length=10, choices=[('csv', 'CSV'), ('excel', 'Excel')])
-    target_model = models.CharField(max_length=100, blank=True, null=True)
+
+class SessionResultChunk(models.Model):
+    """A consecutive run of one session's processed records
+
+    Valid records and invalid rows are stored in chunks so the session row
+    stays small and results can be read page by page.
+    """
+    VALID = "valid"
+    INVALID = "invalid"
+    KIND_CHOICES = ((VALID, "Valid records"), (INVALID, "Invalid rows"))
+
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name='result_chunks')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    number = models.IntegerField(help_text="Position of the chunk within its kind")
+    first_index = models.IntegerField(help_text="Index of the chunk's first record within its kind")
+    record_count = models.IntegerField()
+    records = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        ordering = ['session', 'kind', 'number']
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'kind', 'number'], name='unique_session_result_chunk'),
+        ]
+
+
+class MappingMemory(models.Model):
+    """A header-to-field choice confirmed by a completed import
+
+    Keyed by target model and the header's normalized form, so recurring
+    exports are mapped the way they were last time. Only mapped headers
+    are stored; an import that leaves a header unmapped deletes its row.
+    """
+    target_model = models.CharField(max_length=100)
+    header_key = models.CharField(max_length=255, help_text="Normalized header")
+    header = models.CharField(max_length=255, help_text="Header as last uploaded")
+    model_field = models.CharField(max_length=100, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.target_model}: {self.header} -> {self.model_field or '(unmapped)'}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['target_model', 'header_key'], name='unique_mapping_memory'),
+        ]
+
+
+class MappingProfile(models.Model):
+    """A named target model, column mappings and import options
+
+    An upload that names a profile skips model selection and field
+    mapping and is processed straight away, so recurring feeds can be
+    imported in one request.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    target_model = models.CharField(max_length=100)
     field_mappings = models.JSONField(default=dict, blank=True)
-    preview_data = models.JSONField(default=list, blank=True)
-    processed_data = models.JSONField(default=list, blank=True)
-    validation_errors = models.JSONField(default=list, blank=True)
+    import_options = models.JSONField(default=dict, blank=True, help_text="Import mode and key fields")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    
+
     def __str__(self):
-        return f"{self.original_filename} - {self.created_at}"
-    
+        return f"{self.name} ({self.target_model})"
+
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['name']
@@ -0,0 +1,171 @@
+import io
+import multiprocessing
+import os
+from collections import deque
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Tuple, Iterator, Optional
+
+import pandas as pd
+from django.conf import settings
+
+from .validation import ValidationPlan
+
+
+SCAN_BLOCK_SIZE = 1024 * 1024
+
+# Partitions queued per worker; bounds how many results wait in memory
+QUEUE_DEPTH = 2
+
+
+# The plan a worker process validates with, set once by _init_worker so
+# its lookup caches and inferred date formats last for the whole import
+_worker_plan = None
+
+
+def _init_worker(plan: ValidationPlan):
+    """Worker: set up Django (relation lookups query the database) and keep the plan"""
+    global _worker_plan
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    _worker_plan = plan
+
+
+def _validate_chunk(chunk: pd.DataFrame
+                    ) -> Tuple[List[Dict[str, Any]], List[int], pd.DataFrame, List[Dict[str, Any]], int]:
+    """Worker: validate an already parsed chunk"""
+    return (*_worker_plan.validate_frame_with_rows(chunk), 0)
+
+
+def _validate_csv_partition(path: str, start: int, end: int, headers: List[str]
+                            ) -> Tuple[List[Dict[str, Any]], List[int], pd.DataFrame, List[Dict[str, Any]], int]:
+    """Worker: parse and validate the CSV rows between two byte offsets
+
+    Row numbers in the result are relative to the partition; the caller
+    shifts them by the rows of the partitions before it.
+    """
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        data = handle.read(end - start)
+
+    try:
+        df = pd.read_csv(io.BytesIO(data), header=None, names=headers, index_col=False, dtype=str)
+    except pd.errors.EmptyDataError:
+        return [], [], pd.DataFrame(columns=headers), [], 0
+
+    df.columns = df.columns.astype(str).str.strip()
+    df = df.where(df.notna(), '')
+    return (*_worker_plan.validate_frame_with_rows(df), len(df))
+
+
+class ParallelValidator:
+    """Validates a file's partitions on a pool of worker processes
+
+    CSV files on local disk are split by byte offset at row boundaries
+    and each worker parses its own range. Anything else (Excel, in-memory
+    uploads, files already in the parse cache) is read here and shipped to
+    the workers in row chunks. Each worker receives the validation plan
+    once, so relation lookups are cached per worker for the whole import.
+    Date formats are inferred here from the file's first chunk, as serial
+    validation does, and travel with the plan. Results come back in file
+    order.
+    """
+
+    @staticmethod
+    def iter_results(file, file_type: str, plan: ValidationPlan, workers: int,
+                     chunk_size: Optional[int] = None
+                     ) -> Iterator[Tuple[List[Dict[str, Any]], List[int], pd.DataFrame, List[Dict[str, Any]]]]:
+        """Yield ``(valid_records, valid_rows, valid_data, invalid_records)`` per partition, in file order"""
+        from .parse_cache import ParsedFileCache
+        from .utils import FileProcessor
+
+        if plan.date_rules:
+            # Workers would otherwise each infer from their own partition
+            with closing(FileProcessor._parse_file_chunks(file, file_type, chunk_size)) as chunks:
+                first_chunk = next(chunks, None)
+            if first_chunk is not None:
+                plan.infer_date_formats(first_chunk)
+
+        path = ParallelValidator._local_path(file)
+        cached = ParsedFileCache.root() is not None and ParsedFileCache.load(
+            ParsedFileCache.key_for(file, file_type)
+        ) is not None
+
+        if file_type == 'csv' and path and not cached:
+            headers = pd.read_csv(path, nrows=0, dtype=str).columns.tolist()
+            partition_bytes = getattr(settings, 'MAPPER_PARALLEL_PARTITION_BYTES', 8 * 1024 * 1024)
+            tasks = (
+                (_validate_csv_partition, path, start, end, headers)
+                for start, end in ParallelValidator.csv_partitions(path, partition_bytes)
+            )
+        else:
+            partition_rows = getattr(settings, 'MAPPER_PARALLEL_PARTITION_ROWS', 20000)
+            tasks = (
+                (_validate_chunk, chunk)
+                for chunk in FileProcessor.iter_file_chunks(file, file_type, partition_rows)
+            )
+
+        row_offset = 0
+        # Spawned workers start clean instead of inheriting this process's
+        # database connections
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(plan,)) as executor:
+            pending = deque()
+            for task in tasks:
+                pending.append(executor.submit(*task))
+                if len(pending) >= workers * QUEUE_DEPTH:
+                    row_offset = yield from ParallelValidator._collect(pending.popleft(), row_offset)
+            while pending:
+                row_offset = yield from ParallelValidator._collect(pending.popleft(), row_offset)
+
+    @staticmethod
+    def _collect(future, row_offset: int):
+        valid_records, valid_rows, valid_data, invalid_records, row_count = future.result()
+        if row_count:
+            valid_rows = [row + row_offset for row in valid_rows]
+            for invalid_record in invalid_records:
+                invalid_record['row'] += row_offset
+        yield valid_records, valid_rows, valid_data, invalid_records
+        return row_offset + row_count
+
+    @staticmethod
+    def _local_path(file) -> Optional[str]:
+        """Path of the file on local disk, if it has one"""
+        try:
+            path = file.path
+        except (AttributeError, NotImplementedError, ValueError):
+            return None
+        return path if os.path.exists(path) else None
+
+    @staticmethod
+    def csv_partitions(path: str, partition_bytes: int) -> List[Tuple[int, int]]:
+        """Split a CSV file into byte ranges of whole rows after the header
+
+        A boundary is only placed on a newline preceded by an even number
+        of quote characters, so quoted values spanning lines stay intact.
+        """
+        boundaries = []
+        target = 0
+        offset = 0
+        quotes = 0
+        with open(path, 'rb') as handle:
+            for block in iter(lambda: handle.read(SCAN_BLOCK_SIZE), b''):
+                search = max(target - offset, 0)
+                while search < len(block):
+                    newline = block.find(b'\n', search)
+                    if newline == -1:
+                        break
+                    if (quotes + block.count(b'"', 0, newline)) % 2 == 0:
+                        boundaries.append(offset + newline + 1)
+                        target = offset + newline + 1 + partition_bytes
+                        search = max(target - offset, newline + 1)
+                    else:
+                        search = newline + 1
+                quotes += block.count(b'"')
+                offset += len(block)
+
+        if boundaries and boundaries[-1] < offset:
+            boundaries.append(offset)
+        return list(zip(boundaries, boundaries[1:]))
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterator, Optional
+
+import pandas as pd
+from django.conf import settings
+
+
+# Bump when the parsed chunk layout changes so stale entries are ignored
+CACHE_VERSION = 1
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class ParsedFileCache:
+    """On-disk cache of parsed upload chunks keyed by file content hash
+
+    Each entry is a directory holding the cleaned chunks of one file as
+    pickled DataFrame blocks plus a small ``meta.json``. Entries are
+    written while the file is first parsed and evicted least recently
+    used first once the cache grows past ``MAPPER_PARSE_CACHE_MAX_BYTES``.
+    """
+
+    @staticmethod
+    def root() -> Optional[Path]:
+        """Cache directory, or None when the cache is disabled"""
+        cache_dir = getattr(settings, 'MAPPER_PARSE_CACHE_DIR', None)
+        return Path(cache_dir) if cache_dir else None
+
+    @staticmethod
+    def key_for(file, file_type: str) -> str:
+        """Build the cache key from the file's content hash"""
+        digest = hashlib.sha256()
+        file.seek(0)
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+        file.seek(0)
+        return f"v{CACHE_VERSION}-{file_type}-{digest.hexdigest()}"
+
+    @staticmethod
+    def load(key: str) -> Optional[Iterator[pd.DataFrame]]:
+        """Return an iterator over the cached chunks, or None on a miss"""
+        entry = ParsedFileCache.root() / key
+        try:
+            meta = json.loads((entry / 'meta.json').read_text())
+            # Mark the entry as recently used for eviction
+            os.utime(entry)
+        except (OSError, ValueError):
+            return None
+        return ParsedFileCache._read_chunks(entry, meta['chunks'])
+
+    @staticmethod
+    def _read_chunks(entry: Path, count: int) -> Iterator[pd.DataFrame]:
+        for number in range(count):
+            yield pd.read_pickle(entry / f'chunk-{number:06d}.pkl')
+
+    @staticmethod
+    def store(key: str, chunks: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Pass chunks through while writing them to the cache
+
+        The entry only becomes visible once every chunk has been written;
+        a parse that is abandoned half way leaves nothing behind.
+        """
+        root = ParsedFileCache.root()
+        root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix='.tmp-', dir=root))
+        completed = False
+        try:
+            count = 0
+            for chunk in chunks:
+                chunk.to_pickle(staging / f'chunk-{count:06d}.pkl')
+                count += 1
+                yield chunk
+
+            (staging / 'meta.json').write_text(json.dumps({'chunks': count}))
+            try:
+                staging.rename(root / key)
+                completed = True
+            except OSError:
+                # Another process cached the same file first
+                pass
+        finally:
+            if not completed:
+                shutil.rmtree(staging, ignore_errors=True)
+
+        ParsedFileCache.evict()
+
+    @staticmethod
+    def evict(max_bytes: Optional[int] = None):
+        """Delete least recently used entries until the cache fits its size limit"""
+        root = ParsedFileCache.root()
+        if max_bytes is None:
+            max_bytes = getattr(settings, 'MAPPER_PARSE_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+
+        entries = []
+        total = 0
+        for entry in root.iterdir():
+            if entry.name.startswith('.tmp-') or not entry.is_dir():
+                continue
+            try:
+                size = sum(path.stat().st_size for path in entry.iterdir())
+                entries.append((entry.stat().st_mtime, size, entry))
+            except OSError:
+                continue
+            total += size
+
+        for _, size, entry in sorted(entries, key=lambda item: item[0]):
+            if total <= max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
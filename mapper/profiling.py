@@ -0,0 +1,161 @@
+from typing import Dict, Any, Mapping, Optional
+
+import pandas as pd
+
+from .validation import (
+    INTEGER_TYPES, NUMERIC_TYPES, DATE_TYPES, TRUE_VALUES, FALSE_VALUES, EMAIL_PATTERN, infer_date_format
+)
+
+
+# Distinct values counted per column; columns with more are marked capped
+PROFILE_DISTINCT_LIMIT = 1000
+
+# Most frequent values kept in a stored profile, for choice overlap
+PROFILE_TOP_VALUES = 50
+
+# Share of a column's values a pattern must match to name the column's type
+TYPE_THRESHOLD = 0.9
+
+# Columns fitting their mapped field less than this are reported as type mismatches
+MISMATCH_THRESHOLD = 0.5
+
+PATTERNS = ('integer', 'number', 'boolean', 'date', 'email')
+
+_INTEGER_PATTERN = r'[+-]?\d+(?:\.0*)?'
+_BOOLEAN_VALUES = list(TRUE_VALUES + FALSE_VALUES)
+
+
+class ColumnProfiler:
+    """Accumulates per-column statistics over the chunks of an upload
+
+    Feed it cleaned chunks with ``add()`` and read the result with
+    ``profiles()``: per column the inferred type, null ratio, distinct
+    count, value lengths, the share of values matching the integer,
+    number, boolean, date and email patterns, and the most frequent
+    values. Every statistic is computed with vectorized string operations
+    on the whole chunk. Profiles are plain JSON and are stored on the
+    upload session; ``field_fit()`` scores a profile against a model field.
+    """
+
+    def __init__(self):
+        self.columns = {}
+
+    def add(self, chunk: pd.DataFrame):
+        for column in chunk.columns:
+            stats = self.columns.setdefault(column, {
+                'rows': 0, 'nulls': 0, 'min_length': None, 'max_length': None,
+                'hits': dict.fromkeys(PATTERNS, 0), 'counts': {}, 'capped': False, 'date_format': None,
+            })
+            values = chunk[column].astype(str).str.strip()
+            present = values[values != '']
+            stats['rows'] += len(values)
+            stats['nulls'] += len(values) - len(present)
+            if present.empty:
+                continue
+
+            lengths = present.str.len()
+            if stats['min_length'] is None:
+                stats['min_length'], stats['max_length'] = int(lengths.min()), int(lengths.max())
+            else:
+                stats['min_length'] = min(stats['min_length'], int(lengths.min()))
+                stats['max_length'] = max(stats['max_length'], int(lengths.max()))
+
+            hits = stats['hits']
+            integers = present.str.fullmatch(_INTEGER_PATTERN)
+            hits['integer'] += int(integers.sum())
+            hits['number'] += int(pd.to_numeric(present, errors='coerce').notna().sum())
+            hits['boolean'] += int(present.str.lower().isin(_BOOLEAN_VALUES).sum())
+            hits['email'] += int(present.str.match(EMAIL_PATTERN).sum())
+
+            # Plain numbers would pass for years, so only the rest can be dates
+            candidates = present[~integers]
+            if stats['date_format'] is None and not candidates.empty:
+                stats['date_format'] = infer_date_format(candidates.unique()) or ''
+            if stats['date_format'] and not candidates.empty:
+                parsed = pd.to_datetime(candidates, format=stats['date_format'], errors='coerce')
+                hits['date'] += int(parsed.notna().sum())
+
+            counts = stats['counts']
+            for value, count in present.value_counts(sort=False).items():
+                if value in counts:
+                    counts[value] += count
+                elif len(counts) < PROFILE_DISTINCT_LIMIT:
+                    counts[value] = count
+                else:
+                    stats['capped'] = True
+
+    def profiles(self) -> Dict[str, Dict[str, Any]]:
+        """JSON-ready profile of every column seen"""
+        profiles = {}
+        for column, stats in self.columns.items():
+            present = stats['rows'] - stats['nulls']
+            rates = {
+                pattern: round(hits / present, 4) if present else 0.0
+                for pattern, hits in stats['hits'].items()
+            }
+            top_values = sorted(stats['counts'].items(), key=lambda item: -item[1])[:PROFILE_TOP_VALUES]
+            profiles[column] = {
+                'inferred_type': self.infer_type(rates, present),
+                'rows': stats['rows'],
+                'non_null': present,
+                'null_ratio': round(stats['nulls'] / stats['rows'], 4) if stats['rows'] else 1.0,
+                'distinct_count': len(stats['counts']),
+                'distinct_capped': stats['capped'],
+                'min_length': stats['min_length'],
+                'max_length': stats['max_length'],
+                'pattern_rates': rates,
+                'top_values': {value: int(count) for value, count in top_values},
+            }
+        return profiles
+
+    @staticmethod
+    def infer_type(rates: Mapping[str, float], present: int) -> str:
+        """Type most of a column's values fit, ``text`` when none does"""
+        if not present:
+            return 'empty'
+        # 0/1 columns read as integers; yes/no and true/false as booleans
+        for pattern in ('email', 'date', 'integer', 'boolean', 'number'):
+            if rates[pattern] >= TYPE_THRESHOLD:
+                return pattern
+        return 'text'
+
+    @staticmethod
+    def choice_overlap(profile: Mapping[str, Any], choices) -> float:
+        """Share of a column's values that are valid choices
+
+        Counted over the profile's most frequent values, so columns with
+        many distinct values are underestimated.
+        """
+        present = profile['non_null']
+        if not present or not choices:
+            return 0.0
+        choice_values = {str(choice[0]) for choice in choices}
+        matched = sum(count for value, count in profile['top_values'].items() if value in choice_values)
+        return min(matched / present, 1.0)
+
+    @staticmethod
+    def field_fit(profile: Optional[Mapping[str, Any]], field_info: Mapping[str, Any]) -> float:
+        """How well a column's values suit a model field, from 0 to 1
+
+        Columns without a profile or without values fit every field.
+        """
+        if not profile or profile['inferred_type'] == 'empty':
+            return 1.0
+        field_type = field_info.get('type')
+        rates = profile['pattern_rates']
+        if field_info.get('choices'):
+            return ColumnProfiler.choice_overlap(profile, field_info['choices'])
+        if field_type in INTEGER_TYPES:
+            return rates['integer']
+        if field_type in NUMERIC_TYPES:
+            return rates['number']
+        if field_type == 'BooleanField':
+            return rates['boolean']
+        if field_type in DATE_TYPES:
+            return rates['date']
+        if field_type == 'EmailField':
+            return rates['email']
+        max_length = field_info.get('max_length')
+        if max_length and profile['max_length'] and profile['max_length'] > max_length:
+            return 0.5
+        return 1.0
@@ -0,0 +1,104 @@
+from typing import Dict, List, Any, Iterator, Optional
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import SessionResultChunk, UploadSession
+
+
+class ResultStore:
+    """Reads and clears a session's processed results
+
+    Results live in ``SessionResultChunk`` rows, one per run of records,
+    so readers load only the chunks they need instead of every record.
+    """
+
+    @staticmethod
+    def iter_records(session: UploadSession, kind: str, offset: int = 0) -> Iterator[Dict[str, Any]]:
+        """Yield the stored records of one kind from ``offset`` on in file order, a chunk at a time"""
+        chunks = SessionResultChunk.objects.alias(
+            end_index=F('first_index') + F('record_count')
+        ).filter(session=session, kind=kind, end_index__gt=offset).order_by('number')
+        for first_index, records in chunks.values_list('first_index', 'records').iterator(chunk_size=1):
+            yield from records[max(offset - first_index, 0):]
+
+    @staticmethod
+    def page(session: UploadSession, kind: str, offset: int, limit: int) -> List[Dict[str, Any]]:
+        """Return up to ``limit`` records of one kind starting at ``offset``"""
+        if limit <= 0:
+            return []
+        chunks = SessionResultChunk.objects.alias(
+            end_index=F('first_index') + F('record_count')
+        ).filter(
+            session=session, kind=kind, first_index__lt=offset + limit, end_index__gt=offset
+        ).order_by('number').values_list('first_index', 'records')
+
+        records = []
+        for first_index, chunk_records in chunks:
+            start = max(offset - first_index, 0)
+            records.extend(chunk_records[start:start + limit - len(records)])
+        return records
+
+    @staticmethod
+    def clear(session: UploadSession):
+        """Delete a session's stored results and reset its counts"""
+        SessionResultChunk.objects.filter(session=session).delete()
+        session.valid_count = 0
+        session.invalid_count = 0
+        session.save(update_fields=['valid_count', 'invalid_count', 'updated_at'])
+
+    @staticmethod
+    def chunk_size() -> int:
+        return getattr(settings, 'MAPPER_RESULT_CHUNK_SIZE', 1000)
+
+
+class ResultSink:
+    """Processing sink that stores a session's results chunk by chunk
+
+    Records are buffered per kind and written as full chunks of
+    ``MAPPER_RESULT_CHUNK_SIZE`` records; ``close()`` writes the rest and
+    saves the counts on the session.
+    """
+
+    def __init__(self, session: UploadSession, chunk_size: Optional[int] = None):
+        self.session = session
+        self.chunk_size = chunk_size or ResultStore.chunk_size()
+        self.buffers = {SessionResultChunk.VALID: [], SessionResultChunk.INVALID: []}
+        self.counts = {SessionResultChunk.VALID: 0, SessionResultChunk.INVALID: 0}
+        self.numbers = {SessionResultChunk.VALID: 0, SessionResultChunk.INVALID: 0}
+
+    def write(self, valid_records: List[Dict[str, Any]], invalid_records: List[Dict[str, Any]]):
+        self._add(SessionResultChunk.VALID, valid_records)
+        self._add(SessionResultChunk.INVALID, invalid_records)
+
+    def close(self):
+        for kind in self.buffers:
+            self._flush(kind, final=True)
+        self.session.valid_count = self.counts[SessionResultChunk.VALID]
+        self.session.invalid_count = self.counts[SessionResultChunk.INVALID]
+        self.session.updated_at = timezone.now()
+        UploadSession.objects.filter(pk=self.session.pk).update(
+            valid_count=self.session.valid_count, invalid_count=self.session.invalid_count,
+            updated_at=self.session.updated_at
+        )
+
+    def _add(self, kind: str, records: List[Dict[str, Any]]):
+        if records:
+            self.buffers[kind].extend(records)
+            self._flush(kind)
+
+    def _flush(self, kind: str, final: bool = False):
+        buffer = self.buffers[kind]
+        chunks = []
+        while len(buffer) >= self.chunk_size or (final and buffer):
+            records = buffer[:self.chunk_size]
+            del buffer[:self.chunk_size]
+            chunks.append(SessionResultChunk(
+                session=self.session, kind=kind, number=self.numbers[kind],
+                first_index=self.counts[kind], record_count=len(records), records=records
+            ))
+            self.numbers[kind] += 1
+            self.counts[kind] += len(records)
+        if chunks:
+            SessionResultChunk.objects.bulk_create(chunks)
@@ -0,0 +1,188 @@
+import hashlib
+import json
+from types import MappingProxyType
+from typing import Any, Mapping
+
+from django.apps import apps
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+from .matching import FieldMatcher
+
+
+# Framework apps whose models are never import targets
+SYSTEM_APP_LABELS = ('admin', 'auth', 'contenttypes', 'sessions', 'messages')
+
+# The mapper's own bookkeeping models, never import targets either
+MAPPER_INTERNAL_MODELS = (
+    'mapper.UploadSession', 'mapper.SessionResultChunk', 'mapper.MappingMemory', 'mapper.MappingProfile'
+)
+
+
+class SchemaRegistry:
+    """Process-wide cache of the installed models and their field information
+
+    Model lists and field-info dicts are built once per process and handed
+    out as read-only mappings, so callers share them safely. The cache is
+    rebuilt when the app registry changes (a model is registered, e.g. a
+    dynamic model) and can be dropped explicitly with ``clear()``.
+    ``version()`` fingerprints the cached schema for HTTP validators.
+    """
+
+    _state = None
+    _models = None
+    _fields = {}
+    _schemas = {}
+    _matchers = {}
+    _version = None
+
+    @classmethod
+    def all_models(cls) -> Mapping[str, type]:
+        """``app_label.ModelName`` to model class for every installed model"""
+        cls._check_registry()
+        if cls._models is None:
+            cls._models = MappingProxyType({
+                f"{model._meta.app_label}.{model.__name__}": model
+                for model in apps.get_models()
+            })
+        return cls._models
+
+    @classmethod
+    def model_fields(cls, model_name: str) -> Mapping[str, Mapping[str, Any]]:
+        """Field information of one model, empty if the model is unknown"""
+        models_by_name = cls.all_models()
+        fields_info = cls._fields.get(model_name)
+        if fields_info is None:
+            model = models_by_name.get(model_name)
+            if model is None:
+                return MappingProxyType({})
+            fields_info = cls._build_model_fields(model)
+            cls._fields[model_name] = fields_info
+        return fields_info
+
+    @classmethod
+    def user_models(cls) -> Mapping[str, type]:
+        """Installed models outside the framework's own apps"""
+        return MappingProxyType({
+            model_name: model for model_name, model in cls.all_models().items()
+            if model._meta.app_label not in SYSTEM_APP_LABELS
+        })
+
+    @classmethod
+    def import_targets(cls) -> Mapping[str, type]:
+        """User models that uploads may be imported into"""
+        return MappingProxyType({
+            model_name: model for model_name, model in cls.user_models().items()
+            if model_name not in MAPPER_INTERNAL_MODELS
+        })
+
+    @classmethod
+    def model_schema(cls, model_name: str) -> Mapping[str, Any]:
+        """Schema of one model as served by the schema APIs, None if unknown"""
+        models_by_name = cls.all_models()
+        schema = cls._schemas.get(model_name)
+        if schema is None:
+            model = models_by_name.get(model_name)
+            if model is None:
+                return None
+            fields_info = cls.model_fields(model_name)
+            schema = MappingProxyType({
+                'model_name': model_name,
+                'app_label': model._meta.app_label,
+                'verbose_name': model._meta.verbose_name,
+                'table_name': model._meta.db_table,
+                'fields': fields_info,
+                'required_fields': tuple(name for name, info in fields_info.items() if info.get('required', False)),
+                'optional_fields': tuple(name for name, info in fields_info.items() if not info.get('required', False))
+            })
+            cls._schemas[model_name] = schema
+        return schema
+
+    @classmethod
+    def field_matcher(cls, model_name: str) -> FieldMatcher:
+        """Header matcher indexed over one model's fields"""
+        fields_info = cls.model_fields(model_name)
+        matcher = cls._matchers.get(model_name)
+        if matcher is None:
+            matcher = FieldMatcher(fields_info)
+            if fields_info:
+                cls._matchers[model_name] = matcher
+        return matcher
+
+    @classmethod
+    def version(cls) -> str:
+        """Hash of every model's name, table and field information
+
+        Stable across processes running the same models, so it can serve
+        as an ETag.
+        """
+        models_by_name = cls.all_models()
+        if cls._version is None:
+            digest = hashlib.sha256()
+            for model_name in sorted(models_by_name):
+                model = models_by_name[model_name]
+                entry = [model_name, model._meta.verbose_name, model._meta.db_table,
+                         cls.to_json(cls.model_fields(model_name))]
+                digest.update(json.dumps(entry, sort_keys=True, cls=DjangoJSONEncoder).encode())
+            cls._version = digest.hexdigest()[:32]
+        return cls._version
+
+    @classmethod
+    def clear(cls):
+        """Drop every cached structure; they are rebuilt on next use"""
+        cls._state = None
+        cls._models = None
+        cls._fields = {}
+        cls._schemas = {}
+        cls._matchers = {}
+        cls._version = None
+
+    @classmethod
+    def _check_registry(cls):
+        # Registering a model adds it to apps.all_models, so the model
+        # count per app is a cheap change marker
+        state = (apps.ready, tuple(len(app_models) for app_models in apps.all_models.values()))
+        if state != cls._state:
+            cls.clear()
+            cls._state = state
+
+    @staticmethod
+    def _build_model_fields(model) -> Mapping[str, Mapping[str, Any]]:
+        fields_info = {}
+        for field in model._meta.get_fields():
+            if hasattr(field, 'name'):
+                choices = getattr(field, 'choices', None)
+                field_info = {
+                    'name': field.name,
+                    'verbose_name': str(field.verbose_name) if hasattr(field, 'verbose_name') else None,
+                    'type': field.__class__.__name__,
+                    'required': not (field.blank or field.null) if hasattr(field, 'blank') else True,
+                    'max_length': getattr(field, 'max_length', None),
+                    'choices': tuple(tuple(choice) for choice in choices) if choices else choices,
+                    'help_text': getattr(field, 'help_text', ''),
+                    'unique': getattr(field, 'unique', False),
+                    'default': SchemaRegistry._json_default(getattr(field, 'default', None))
+                }
+
+                # Handle special field types
+                if isinstance(field, (models.ForeignKey, models.ManyToManyField)):
+                    field_info['related_model'] = f"{field.related_model._meta.app_label}.{field.related_model.__name__}"
+
+                fields_info[field.name] = MappingProxyType(field_info)
+        return MappingProxyType(fields_info)
+
+    @staticmethod
+    def _json_default(default: Any) -> Any:
+        """A field default in a JSON-safe form; None when unset or computed per row"""
+        if default is models.NOT_PROVIDED or callable(default):
+            return None
+        return default
+
+    @staticmethod
+    def to_json(value: Any) -> Any:
+        """Plain dict/list copy of a cached structure, for JSON responses"""
+        if isinstance(value, Mapping):
+            return {key: SchemaRegistry.to_json(item) for key, item in value.items()}
+        if isinstance(value, tuple):
+            return [SchemaRegistry.to_json(item) for item in value]
+        return value
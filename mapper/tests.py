@@ -1,3 +1,467 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+import pandas as pd
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .importer import BulkImporter, IMPORT_MODE_UPSERT
+from .mapping_memory import MappingHistory
+from .models import MappingMemory, UploadSession
+from .parallel import ParallelValidator
+from .sample_models import Product
+from .utils import FieldMapper, FileProcessor, ListSink, ModelIntrospector
+from .validation import ValidationPlan, validate_value
+from .workflow import UploadWorkflow
+
+
+PRODUCTS_CSV = (
+    b"name,sku,price\n"
+    b"Laptop,LAP-001,1299.99\n"
+    b"Mouse,MSE-002,29.99\n"
+    b"Cable,,4.50\n"
+)
+
+# Cells of every kind the validators treat differently; Excel cells may
+# also be numbers and booleans
+CELL_VALUES = [
+    '', '5', ' 7 ', '1_000', '1e3', '-3.7', 'abc', 'inf', '99999999999999999999', '1.5e20',
+    'True', 'false', 'YES', 'on', 'x@y.com', 'bad@', '2020-01-05', '05/01/2020',
+    'Male', 'Female', 'A+', 'Hostel', 'Academic', 'ab' * 40, 5, 5.5, True,
+]
+
+
+class VectorizedValidationTests(SimpleTestCase):
+    """Whole-column validation converts and rejects cells exactly like the per-cell validator"""
+
+    def assertMatchesScalar(self, model_name):
+        fields_info = ModelIntrospector.get_model_fields(model_name)
+        frame = pd.DataFrame({'value': pd.Series(CELL_VALUES, dtype=object)})
+        for field_name, field_info in fields_info.items():
+            if field_info.get('related_model'):
+                continue
+            with self.subTest(model=model_name, field=field_name):
+                expected_valid = []
+                expected_invalid = []
+                for row, value in enumerate(CELL_VALUES, start=1):
+                    is_valid, error_msg, converted_value = validate_value(field_info, value)
+                    if is_valid:
+                        expected_valid.append({field_name: converted_value})
+                    else:
+                        expected_invalid.append({
+                            'row': row,
+                            'data': {'value': value},
+                            'errors': [{'field': field_name, 'value': value, 'error': error_msg}]
+                        })
+
+                valid_records, invalid_records = ValidationPlan({'value': field_name}, fields_info).validate_frame(frame)
+                self.assertEqual(valid_records, expected_valid)
+                self.assertEqual(invalid_records, expected_invalid)
+
+    def test_product_fields(self):
+        self.assertMatchesScalar('mapper.Product')
+
+    def test_user_record_fields(self):
+        self.assertMatchesScalar('mapper.UserRecord')
+
+
+class CsvPartitionTests(SimpleTestCase):
+    """CSV partitions split between rows, never inside a quoted value"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, 'addresses.csv')
+        with open(self.path, 'w', newline='') as handle:
+            handle.write('name,address,note\n')
+            for number in range(40):
+                handle.write(f'User {number},"{number} Main St\nFloor {number % 3}","said ""hi""\n"\n')
+                handle.write(f'Plain {number},{number} Side St,none\n')
+        self.expected = pd.read_csv(self.path, dtype=str)
+
+    def assertPartitionsReadBack(self, partition_bytes):
+        headers = self.expected.columns.tolist()
+        partitions = ParallelValidator.csv_partitions(self.path, partition_bytes)
+        self.assertGreater(len(partitions), 1)
+        self.assertEqual(partitions[-1][1], os.path.getsize(self.path))
+        frames = []
+        with open(self.path, 'rb') as handle:
+            for start, end in partitions:
+                handle.seek(start)
+                frames.append(pd.read_csv(io.BytesIO(handle.read(end - start)), header=None, names=headers, dtype=str))
+        pd.testing.assert_frame_equal(pd.concat(frames, ignore_index=True), self.expected)
+
+    def test_row_per_partition(self):
+        self.assertPartitionsReadBack(1)
+
+    def test_several_rows_per_partition(self):
+        self.assertPartitionsReadBack(200)
+
+    def test_quotes_split_across_scan_blocks(self):
+        for block_size in (5, 7, 16):
+            with self.subTest(block_size=block_size), mock.patch('mapper.parallel.SCAN_BLOCK_SIZE', block_size):
+                self.assertPartitionsReadBack(1)
+
+
+@override_settings(MAPPER_PARSE_CACHE_DIR=None)
+class ExcelChunkTests(TestCase):
+    """Streamed .xlsx rows are numbered the way pd.read_excel numbers them"""
+
+    def setUp(self):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        for row in [('name', 'sku', 'price'), ('Laptop', 'LAP-001', 1299.99), ('Mouse', 'MSE-002', 29.99),
+                    (None, None, None), ('Cable', None, 4.5), (None, None, None)]:
+            sheet.append(row)
+        content = io.BytesIO()
+        workbook.save(content)
+        self.file = SimpleUploadedFile('products.xlsx', content.getvalue())
+
+    def test_blank_rows_keep_row_numbers(self):
+        chunks = list(FileProcessor.iter_file_chunks(self.file, 'excel', chunk_size=2))
+        self.file.seek(0)
+        expected = pd.read_excel(self.file, dtype=object)
+        expected = expected.where(expected.notna(), '')
+        pd.testing.assert_frame_equal(pd.concat(chunks), expected, check_index_type=False)
+
+        valid, invalid = FileProcessor.process_full_file(
+            self.file, 'excel', {'name': 'name', 'sku': 'sku', 'price': 'price'}, 'mapper.Product'
+        )
+        self.assertEqual(len(valid), 2)
+        self.assertEqual([record['row'] for record in invalid], [3, 4])
+
+
+@override_settings(MAPPER_PARSE_CACHE_DIR=None)
+class UniquenessTests(TestCase):
+    """Unique values may not repeat in the file or, outside upserts, match existing rows"""
+
+    def check(self, lines, **import_options):
+        """Errors of each invalid row, validating two rows per chunk"""
+        content = 'name,sku,price\n' + ''.join(f'{line}\n' for line in lines)
+        sink = ListSink()
+        FileProcessor.process_file_in_chunks(
+            SimpleUploadedFile('products.csv', content.encode()), 'csv',
+            {'name': 'name', 'sku': 'sku', 'price': 'price'}, 'mapper.Product', sink,
+            chunk_size=2, import_options=import_options
+        )
+        self.assertEqual(len(sink.valid_records) + len(sink.invalid_records), len(lines))
+        return {record['row']: [error['error'] for error in record['errors']] for record in sink.invalid_records}
+
+    def test_duplicates_within_and_across_chunks(self):
+        errors = self.check([
+            'Laptop,LAP-001,10', 'Mouse,MSE-002,5',
+            'Laptop 2,LAP-001,11', 'Cable,CBL-003,2',
+            'Mouse 2,MSE-002,6', 'Cable 2,CBL-003,3',
+        ])
+        self.assertEqual(errors, {
+            3: ['Duplicate value in file, first seen in row 1'],
+            5: ['Duplicate value in file, first seen in row 2'],
+            6: ['Duplicate value in file, first seen in row 4'],
+        })
+
+    def test_existing_rows(self):
+        Product.objects.create(name='Mouse', sku='MSE-002', price=5)
+        errors = self.check(['Laptop,LAP-001,10', 'Cable,CBL-003,2', 'Mouse,MSE-002,5'])
+        self.assertEqual(errors, {3: ['A Product with this sku already exists']})
+
+    def test_upsert_key_may_match_existing_rows(self):
+        Product.objects.create(name='Mouse', sku='MSE-002', price=5)
+        errors = self.check(['Laptop,LAP-001,10', 'Mouse,MSE-002,6', 'Mouse 2,MSE-002,7'], mode=IMPORT_MODE_UPSERT)
+        self.assertEqual(errors, {3: ['Duplicate value in file, first seen in row 2']})
+
+    def test_upsert_other_unique_fields_clash_with_other_keys(self):
+        Product.objects.create(name='Mouse', sku='MSE-002', price=5)
+        errors = self.check(['Mouse,MSE-002,6', 'Keyboard,KBD-004,20'], mode=IMPORT_MODE_UPSERT, key_fields=['name'])
+        self.assertEqual(errors, {})
+        errors = self.check(['Keyboard,MSE-002,20'], mode=IMPORT_MODE_UPSERT, key_fields=['name'])
+        self.assertEqual(errors, {1: ['A Product with this sku already exists']})
+
+
+class UpsertTests(TestCase):
+    """Upserts update rows matching the key and insert the rest, on either write path"""
+
+    def setUp(self):
+        BulkImporter('mapper.Product').import_records([
+            {'name': 'Laptop', 'sku': 'LAP-001', 'price': 1299.99, 'quantity': 1},
+            {'name': 'Mouse', 'sku': 'MSE-002', 'price': 29.99, 'quantity': 2},
+        ])
+
+    def upsert(self):
+        with CaptureQueriesContext(connection) as queries:
+            imported = BulkImporter('mapper.Product', mode=IMPORT_MODE_UPSERT).import_records([
+                {'name': 'Laptop Pro', 'sku': 'LAP-001', 'price': 1499.0, 'quantity': 5},
+                {'name': 'Cable', 'sku': 'CBL-003', 'price': 4.5, 'quantity': 10},
+                # A key repeated within the batch keeps its last row
+                {'name': 'Laptop Max', 'sku': 'LAP-001', 'price': 1999.0, 'quantity': 9},
+            ])
+        self.assertEqual(imported, 3)
+        self.assertEqual(
+            list(Product.objects.order_by('sku').values_list('sku', 'name', 'quantity')),
+            [('CBL-003', 'Cable', 10), ('LAP-001', 'Laptop Max', 9), ('MSE-002', 'Mouse', 2)]
+        )
+        return [query['sql'] for query in queries.captured_queries]
+
+    def test_update_conflicts(self):
+        if not connection.features.supports_update_conflicts_with_target:
+            self.skipTest('Database does not support ON CONFLICT ... DO UPDATE')
+        statements = self.upsert()
+        self.assertTrue(any('ON CONFLICT' in sql for sql in statements))
+
+    def test_lookup_and_bulk_update(self):
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            statements = self.upsert()
+        self.assertFalse(any('ON CONFLICT' in sql for sql in statements))
+        self.assertTrue(any(sql.startswith('UPDATE') for sql in statements))
+
+
+class MappingHistoryTests(TestCase):
+    """Confirmed mappings are suggested next time, and unmapping a header forgets it"""
+
+    def setUp(self):
+        MappingHistory.clear()
+        self.addCleanup(MappingHistory.clear)
+
+    def suggest(self, headers):
+        model_fields = ModelIntrospector.get_model_fields('mapper.Product')
+        return FieldMapper.suggest_mappings(headers, model_fields, 'mapper.Product')
+
+    def test_remembered_mapping_is_suggested(self):
+        MappingHistory.remember('mapper.Product', {'Description': 'category', 'Notes': ''})
+        self.assertEqual(MappingHistory.recall('mapper.Product', ['Description', 'Notes']), {'Description': 'category'})
+        self.assertEqual(self.suggest(['Description'])['Description'], 'category')
+
+    def test_unmapped_header_is_forgotten(self):
+        MappingHistory.remember('mapper.Product', {'Description': 'category', 'SKU': 'sku'})
+        # Loads the cache, which the second import must update as well
+        self.assertEqual(MappingHistory.recall('mapper.Product', ['Description']), {'Description': 'category'})
+
+        MappingHistory.remember('mapper.Product', {'Description': None, 'SKU': 'sku'})
+        self.assertEqual(MappingHistory.recall('mapper.Product', ['Description', 'SKU']), {'SKU': 'sku'})
+        self.assertEqual(list(MappingMemory.objects.values_list('model_field', flat=True)), ['sku'])
+        self.assertEqual(self.suggest(['Description'])['Description'], 'description')
+
+
+class SessionTestCase(TestCase):
+    """Runs each test on a fresh products upload mapped to Product"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root, MAPPER_PARSE_CACHE_DIR=None))
+        cls.addClassCleanup(shutil.rmtree, cls.media_root, ignore_errors=True)
+        super().setUpClass()
+
+    def setUp(self):
+        self.session = UploadWorkflow.start(SimpleUploadedFile('products.csv', PRODUCTS_CSV))
+        self.session.target_model = 'mapper.Product'
+        self.session.field_mappings = {'name': 'name', 'sku': 'sku', 'price': 'price'}
+        self.session.save()
+
+    def url(self, name):
+        return reverse(name, args=[self.session.id])
+
+    def process(self):
+        UploadWorkflow.process(UploadSession.objects.get(id=self.session.id))
+
+    def reload(self):
+        return UploadSession.objects.get(id=self.session.id)
+
+
+class CommitTests(SessionTestCase):
+    """A session is imported once; a failed import resumes after its written batches"""
+
+    def setUp(self):
+        super().setUp()
+        self.process()
+
+    def commit(self, batch_size=None):
+        return BulkImporter.commit_session(self.reload(), batch_size)
+
+    def test_second_commit_is_refused(self):
+        self.assertEqual(self.commit(), 2)
+        with self.assertRaisesMessage(ValueError, 'has been imported already'):
+            self.commit()
+
+        response = self.client.post(self.url('commit_import'), follow=True)
+        self.assertContains(response, 'has been imported already')
+        session = self.reload()
+        self.assertEqual((session.import_status, session.imported_count), (UploadSession.IMPORT_COMPLETED, 2))
+        self.assertEqual(Product.objects.count(), 2)
+
+    def test_failed_batch_keeps_earlier_batches_and_retry_resumes(self):
+        # The second row's sku is taken, so its batch fails
+        taken = Product.objects.create(name='Old mouse', sku='MSE-002', price=1)
+        with self.assertRaisesMessage(ValueError, 'Error importing batch 2'):
+            self.commit(batch_size=1)
+        session = self.reload()
+        self.assertEqual((session.import_status, session.imported_count), (UploadSession.IMPORT_FAILED, 1))
+        self.assertTrue(session.import_error)
+        self.assertEqual(Product.objects.filter(sku='LAP-001').count(), 1)
+
+        with self.assertRaisesMessage(ValueError, 'Records of this session were imported already'):
+            self.process()
+
+        taken.delete()
+        self.assertEqual(self.commit(batch_size=1), 2)
+        session = self.reload()
+        self.assertEqual((session.import_status, session.imported_count), (UploadSession.IMPORT_COMPLETED, 2))
+        self.assertEqual(sorted(Product.objects.values_list('sku', flat=True)), ['LAP-001', 'MSE-002'])
+
+    def test_unexpected_error_marks_import_failed(self):
+        with mock.patch('mapper.result_store.ResultStore.iter_records', side_effect=RuntimeError('database gone')):
+            response = self.client.post(self.url('commit_import'), follow=True)
+        self.assertContains(response, 'database gone')
+        session = self.reload()
+        self.assertEqual(session.import_status, UploadSession.IMPORT_FAILED)
+        self.assertEqual(session.import_error, 'database gone')
+
+        self.assertEqual(self.commit(), 2)
+        self.assertEqual(self.reload().import_status, UploadSession.IMPORT_COMPLETED)
+
+
+class ImportOptionTests(SessionTestCase):
+    """Import options are checked before they are stored on the session"""
+
+    def post_options(self, mode, key_fields=''):
+        return self.client.post(self.url('process_file'), {'mode': mode, 'key_fields': key_fields}, follow=True)
+
+    def test_invalid_options_are_not_stored(self):
+        cases = [
+            ('bogus', '', 'Unknown import mode: bogus'),
+            ('upsert', 'nope', 'Unknown key field: nope'),
+            ('upsert', 'name', 'Key fields must be unique together: name'),
+        ]
+        for mode, key_fields, error in cases:
+            with self.subTest(mode=mode, key_fields=key_fields):
+                response = self.post_options(mode, key_fields)
+                self.assertRedirects(response, self.url('field_mapping'))
+                self.assertContains(response, error)
+                self.assertEqual(self.reload().import_options, {})
+
+    def test_valid_options_are_stored(self):
+        response = self.post_options('upsert', 'sku')
+        self.assertRedirects(response, self.url('results'))
+        self.assertEqual(self.reload().import_options, {'mode': 'upsert', 'key_fields': ['sku']})
+
+
+class SessionQueryTests(SessionTestCase):
+    """Session views load only the columns they use, in a fixed number of queries"""
+
+    def assertSessionColumns(self, queries, loaded=(), not_loaded=UploadSession.PAYLOAD_FIELDS):
+        """Check which payload columns the view's session queries select"""
+        selects = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT') and 'FROM "mapper_uploadsession"' in query['sql']
+        ]
+        self.assertTrue(selects)
+        session_select = selects[0]
+        for name in loaded:
+            self.assertIn(f'"mapper_uploadsession"."{name}"', session_select)
+        for name in not_loaded:
+            if name not in loaded:
+                for sql in selects:
+                    self.assertNotIn(f'"mapper_uploadsession"."{name}"', sql)
+
+    def test_default_manager_defers_payloads(self):
+        with CaptureQueriesContext(connection) as queries:
+            session = UploadSession.objects.get(id=self.session.id)
+        self.assertSessionColumns(queries)
+        self.assertEqual(session.get_deferred_fields(), set(UploadSession.PAYLOAD_FIELDS))
+
+        session = UploadSession.objects.with_payloads().get(id=self.session.id)
+        self.assertEqual(session.get_deferred_fields(), set())
+
+    def test_model_selection(self):
+        with CaptureQueriesContext(connection) as queries, self.assertNumQueries(1):
+            response = self.client.get(self.url('model_selection'))
+        self.assertEqual(response.status_code, 200)
+        self.assertSessionColumns(queries, loaded=['preview_data'])
+
+    def test_select_model(self):
+        with CaptureQueriesContext(connection) as queries, self.assertNumQueries(2):
+            response = self.client.post(self.url('select_model'), {'target_model': 'mapper.Customer'})
+        self.assertEqual(response.status_code, 302)
+        self.assertSessionColumns(queries, not_loaded=UploadSession.PAYLOAD_FIELDS + ('field_mappings',))
+        self.assertEqual(UploadSession.objects.get(id=self.session.id).target_model, 'mapper.Customer')
+
+    def test_field_mapping(self):
+        with CaptureQueriesContext(connection) as queries, self.assertNumQueries(1):
+            response = self.client.get(self.url('field_mapping'))
+        self.assertEqual(response.status_code, 200)
+        self.assertSessionColumns(queries, loaded=['preview_data'])
+
+    def test_update_mapping(self):
+        with CaptureQueriesContext(connection) as queries, self.assertNumQueries(2):
+            response = self.client.post(
+                self.url('update_mapping'), json.dumps({'csv_field': 'sku', 'model_field': ''}),
+                content_type='application/json'
+            )
+        self.assertTrue(response.json()['success'])
+        self.assertSessionColumns(queries, loaded=['field_mappings'])
+        update = queries.captured_queries[-1]['sql']
+        self.assertNotIn('"preview_data"', update)
+        self.assertNotIn('"import_options"', update)
+
+    def test_update_mappings(self):
+        changes = {'name': '', 'sku': 'name'}
+        with CaptureQueriesContext(connection) as queries, self.assertNumQueries(2):
+            response = self.client.post(
+                self.url('update_mappings'), json.dumps({'mappings': changes}), content_type='application/json'
+            )
+        self.assertTrue(response.json()['success'])
+        self.assertSessionColumns(queries, loaded=['field_mappings'])
+        self.assertEqual(
+            UploadSession.objects.get(id=self.session.id).field_mappings,
+            {'name': '', 'sku': 'name', 'price': 'price'}
+        )
+
+    def test_process_file(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url('process_file'), {'mode': 'insert'})
+        self.assertRedirects(response, self.url('results'), fetch_redirect_response=False)
+        self.assertSessionColumns(queries, loaded=['field_mappings', 'import_options'])
+
+    def test_results(self):
+        self.process()
+        with CaptureQueriesContext(connection) as queries, self.assertNumQueries(3):
+            response = self.client.get(self.url('results'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['valid_count'], 2)
+        self.assertSessionColumns(queries, not_loaded=UploadSession.PAYLOAD_FIELDS + ('field_mappings',))
+
+    def test_downloads(self):
+        self.process()
+        with CaptureQueriesContext(connection) as queries, self.assertNumQueries(2):
+            response = self.client.get(self.url('download_json'), {'format': 'csv'})
+            content = b''.join(response.streaming_content)
+        self.assertEqual(content.count(b'\n'), 3)
+        self.assertSessionColumns(queries)
+
+        with CaptureQueriesContext(connection) as queries, self.assertNumQueries(2):
+            response = self.client.get(self.url('download_errors'))
+            content = b''.join(response.streaming_content)
+        self.assertEqual(len(json.loads(content)), 1)
+        self.assertSessionColumns(queries)
+
+    def test_session_results_api(self):
+        self.process()
+        with CaptureQueriesContext(connection) as queries, self.assertNumQueries(2):
+            response = self.client.get(self.url('api_session_records'))
+        self.assertEqual(response.json()['total'], 2)
+        self.assertSessionColumns(queries, not_loaded=UploadSession.PAYLOAD_FIELDS + ('field_mappings',))
+
+    def test_suggest_mappings_api(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('api_suggest_mappings'), {
+                'model_name': 'mapper.Product', 'session_id': self.session.id, 'csv_headers': ['name', 'sku']
+            })
+        self.assertTrue(response.json()['success'])
+        self.assertSessionColumns(queries, loaded=['column_profiles'], not_loaded=['preview_data'])
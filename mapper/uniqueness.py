@@ -0,0 +1,107 @@
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .lookups import LOOKUP_BATCH_SIZE
+
+
+class UniquenessChecker:
+    """Flags rows whose unique field values repeat in the file or the database
+
+    Runs after validation on each chunk's valid records, in file order.
+    Repeats within a chunk are found with ``duplicated()`` and repeats of
+    earlier chunks against the first row seen for each value. Values that
+    already exist in the target table are fetched with one ``IN`` query
+    per unique field and batch. In upsert mode the key fields may match
+    existing rows (those rows are updated), and other unique fields only
+    clash with rows that have a different key.
+    """
+
+    def __init__(self, model, plan, key_fields: Optional[List[str]] = None):
+        self.model = model
+        self.key_fields = list(key_fields or [])
+        self.fields = [
+            rule.model_field for rule in plan.rules
+            if rule.field_info.get('unique') and not rule.many
+        ]
+        self.csv_fields = {rule.model_field: rule.csv_field for rule in plan.rules}
+        self.first_rows = {field: {} for field in self.fields}
+
+    def check(self, valid_records: List[Dict[str, Any]], valid_rows: List[int], valid_data: pd.DataFrame,
+              invalid_records: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Move valid records with clashing unique values to the invalid records
+
+        ``valid_data`` holds the uploaded rows of the valid records; moved
+        rows are reported with them, like any other invalid row.
+        """
+        if not self.fields or not valid_records:
+            return valid_records, invalid_records
+
+        # Object columns keep the converted values exact (no int to float upcasts)
+        columns = self.fields + [key_field for key_field in self.key_fields if key_field not in self.fields]
+        frame = pd.DataFrame({
+            column: pd.Series([record.get(column) for record in valid_records], dtype=object)
+            for column in columns
+        })
+        rows = np.asarray(valid_rows)
+        row_errors = {}
+
+        for field in self.fields:
+            values = frame[field]
+            present = values.notna().to_numpy()
+            first_rows = self.first_rows[field]
+
+            seen = np.fromiter((value in first_rows for value in values), dtype=bool, count=len(values))
+            repeated = present & (values.duplicated().to_numpy() | seen)
+            for position in np.flatnonzero(present & ~repeated):
+                first_rows[values.iat[position]] = int(rows[position])
+            for position in np.flatnonzero(repeated):
+                row_errors.setdefault(position, []).append(
+                    (field, f"Duplicate value in file, first seen in row {first_rows[values.iat[position]]}")
+                )
+
+            if field in self.key_fields:
+                continue
+            clashes = self._existing(field, pd.unique(values[present & ~repeated].to_numpy()))
+            for position in np.flatnonzero(present & ~repeated):
+                existing_keys = clashes.get(values.iat[position])
+                if existing_keys is None:
+                    continue
+                if self.key_fields and existing_keys == {self._record_key(frame, position)}:
+                    continue
+                row_errors.setdefault(position, []).append(
+                    (field, f"A {self.model._meta.verbose_name} with this {field} already exists")
+                )
+
+        if not row_errors:
+            return valid_records, invalid_records
+
+        positions = sorted(row_errors)
+        kept = [record for position, record in enumerate(valid_records) if position not in row_errors]
+        flagged = []
+        for position, data in zip(positions, valid_data.iloc[positions].to_dict('records')):
+            flagged.append({
+                'row': int(rows[position]),
+                'data': data,
+                'errors': [
+                    {'field': field, 'value': data.get(self.csv_fields[field]), 'error': message}
+                    for field, message in row_errors[position]
+                ]
+            })
+
+        return kept, sorted(invalid_records + flagged, key=lambda invalid_record: invalid_record['row'])
+
+    def _existing(self, field: str, values) -> Dict[Any, set]:
+        """Existing values of a unique field, with the key of each row holding them"""
+        clashes = {}
+        values = list(values)
+        for start in range(0, len(values), LOOKUP_BATCH_SIZE):
+            batch = values[start:start + LOOKUP_BATCH_SIZE]
+            rows = self.model._default_manager.filter(**{f"{field}__in": batch}).values_list(field, *self.key_fields)
+            for row in rows:
+                clashes.setdefault(row[0], set()).add(tuple(row[1:]))
+        return clashes
+
+    def _record_key(self, frame: pd.DataFrame, position: int) -> Tuple[Any, ...]:
+        return tuple(frame[key_field].iat[position] for key_field in self.key_fields)
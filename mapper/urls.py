@@ -9,14 +9,22 @@ urlpatterns = [
     path('session/<int:session_id>/select-model/', views.select_model, name='select_model'),
     path('session/<int:session_id>/field-mapping/', views.field_mapping, name='field_mapping'),
     path('session/<int:session_id>/update-mapping/', views.update_mapping, name='update_mapping'),
+    path('session/<int:session_id>/update-mappings/', views.update_mappings, name='update_mappings'),
     path('session/<int:session_id>/process/', views.process_file, name='process_file'),
     path('session/<int:session_id>/results/', views.results, name='results'),
+    path('session/<int:session_id>/commit/', views.commit_import, name='commit_import'),
+    path('session/<int:session_id>/save-profile/', views.save_profile, name='save_profile'),
     path('session/<int:session_id>/download-json/', views.download_json, name='download_json'),
     path('session/<int:session_id>/download-errors/', views.download_errors, name='download_errors'),
     
     # API URLs for dynamic model discovery and mapping
     path('api/models/', api_views.get_available_models, name='api_get_models'),
+    path('api/models/schemas/', api_views.get_model_schemas, name='api_get_model_schemas'),
     path('api/models/<str:model_name>/schema/', api_views.get_model_schema, name='api_get_model_schema'),
     path('api/validate-mapping/', api_views.validate_mapping, name='api_validate_mapping'),
     path('api/suggest-mappings/', api_views.suggest_mappings, name='api_suggest_mappings'),
+    path('api/sessions/<int:session_id>/records/', api_views.get_session_records, name='api_session_records'),
+    path('api/sessions/<int:session_id>/errors/', api_views.get_session_errors, name='api_session_errors'),
+    path('api/profiles/', api_views.get_mapping_profiles, name='api_mapping_profiles'),
+    path('api/import/', api_views.import_with_profile, name='api_import_with_profile'),
 ]
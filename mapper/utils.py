@@ -1,124 +1,43 @@
 import pandas as pd
 import openpyxl
-from django.apps import apps
+from django.conf import settings
 from django.db import models
 from django.core.exceptions import ValidationError
 import json
 import io
-from typing import Dict, List, Any, Tuple, Optional
+from contextlib import closing
+from typing import Dict, List, Any, Tuple, Optional, Iterator, Iterable, Mapping
+
+from .mapping_memory import MappingHistory
+from .matching import FieldMatcher
+from .parallel import ParallelValidator
+from .parse_cache import ParsedFileCache
+from .profiling import ColumnProfiler
+from .schema_registry import SchemaRegistry
+from .uniqueness import UniquenessChecker
+from .validation import ValidationPlan, validate_value
 
 
 class ModelIntrospector:
     """Utility class for introspecting Django models dynamically"""
     
     @staticmethod
-    def get_all_models() -> Dict[str, models.Model]:
-        """Get all available Django models"""
-        all_models = {}
-        for model in apps.get_models():
-            app_label = model._meta.app_label
-            model_name = model.__name__
-            full_name = f"{app_label}.{model_name}"
-            all_models[full_name] = model
-        return all_models
+    def get_all_models() -> Mapping[str, models.Model]:
+        """Get all available Django models (cached, read-only)"""
+        return SchemaRegistry.all_models()
     
     @staticmethod
-    def get_model_fields(model_name: str) -> Dict[str, Dict[str, Any]]:
-        """Get field information for a specific model"""
+    def get_model_fields(model_name: str) -> Mapping[str, Mapping[str, Any]]:
+        """Get field information for a specific model (cached, read-only)"""
         try:
-            all_models = ModelIntrospector.get_all_models()
-            if model_name not in all_models:
-                return {}
-            
-            model = all_models[model_name]
-            fields_info = {}
-            
-            for field in model._meta.get_fields():
-                if hasattr(field, 'name'):
-                    field_info = {
-                        'name': field.name,
-                        'type': field.__class__.__name__,
-                        'required': not (field.blank or field.null) if hasattr(field, 'blank') else True,
-                        'max_length': getattr(field, 'max_length', None),
-                        'choices': getattr(field, 'choices', None),
-                        'help_text': getattr(field, 'help_text', ''),
-                        'default': getattr(field, 'default', None)
-                    }
-                    
-                    # Handle special field types
-                    if isinstance(field, models.ForeignKey):
-                        field_info['related_model'] = f"{field.related_model._meta.app_label}.{field.related_model.__name__}"
-                    
-                    fields_info[field.name] = field_info
-            
-            return fields_info
+            return SchemaRegistry.model_fields(model_name)
         except Exception as e:
             return {}
     
     @staticmethod
     def validate_field_value(field_info: Dict[str, Any], value: Any) -> Tuple[bool, str, Any]:
         """Validate a value against a field definition"""
-        try:
-            if value is None or value == '':
-                if field_info.get('required', True):
-                    return False, "This field is required", None
-                return True, "", None
-            
-            field_type = field_info['type']
-            converted_value = value
-            
-            # Type conversion based on field type
-            if field_type in ['IntegerField', 'BigIntegerField', 'SmallIntegerField']:
-                try:
-                    converted_value = int(float(str(value)))
-                except (ValueError, TypeError):
-                    return False, f"Invalid integer value: {value}", None
-            
-            elif field_type in ['FloatField', 'DecimalField']:
-                try:
-                    converted_value = float(value)
-                except (ValueError, TypeError):
-                    return False, f"Invalid numeric value: {value}", None
-            
-            elif field_type == 'BooleanField':
-                if str(value).lower() in ['true', '1', 'yes', 'on']:
-                    converted_value = True
-                elif str(value).lower() in ['false', '0', 'no', 'off']:
-                    converted_value = False
-                else:
-                    return False, f"Invalid boolean value: {value}", None
-            
-            elif field_type in ['CharField', 'TextField']:
-                converted_value = str(value)
-                max_length = field_info.get('max_length')
-                if max_length and len(converted_value) > max_length:
-                    return False, f"Text too long (max {max_length} characters)", None
-            
-            elif field_type in ['DateField', 'DateTimeField']:
-                try:
-                    # Try to parse date/datetime
-                    converted_value = pd.to_datetime(value).isoformat()
-                except Exception:
-                    return False, f"Invalid date/datetime format: {value}", None
-            
-            elif field_type == 'EmailField':
-                import re
-                email_regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-                if not re.match(email_regex, str(value)):
-                    return False, f"Invalid email format: {value}", None
-                converted_value = str(value)
-            
-            # Check choices if available
-            choices = field_info.get('choices')
-            if choices:
-                valid_choices = [choice[0] for choice in choices]
-                if converted_value not in valid_choices:
-                    return False, f"Invalid choice. Must be one of: {valid_choices}", None
-            
-            return True, "", converted_value
-            
-        except Exception as e:
-            return False, f"Validation error: {str(e)}", None
+        return validate_value(field_info, value)
 
 
 class FileProcessor:
@@ -135,6 +54,79 @@ class FileProcessor:
         else:
             raise ValueError("Unsupported file type. Please upload CSV or Excel files only.")
     
+    @staticmethod
+    def is_legacy_excel(file) -> bool:
+        """Check whether an Excel upload is the old binary .xls format"""
+        return file.name.lower().endswith('.xls')
+    
+    @staticmethod
+    def iter_excel_chunks(file, chunk_size: int) -> Iterator[pd.DataFrame]:
+        """Stream the first sheet of an .xlsx file in chunks of rows
+
+        Uses openpyxl's read-only mode, so only the rows of the current
+        chunk are held in memory. Like ``pd.read_excel``, blank rows are
+        kept unless they trail the data, so row numbers match the sheet,
+        and headers are named the same way. At least one (possibly empty)
+        chunk is always yielded so callers get the headers.
+        """
+        file.seek(0)
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            headers = []
+            for row in rows:
+                if any(cell is not None for cell in row):
+                    headers = FileProcessor._excel_headers(row)
+                    break
+            
+            width = len(headers)
+            start = 0
+            chunk = []
+            for row in FileProcessor._excel_data_rows(rows, width):
+                chunk.append(row)
+                if len(chunk) == chunk_size:
+                    yield pd.DataFrame(chunk, columns=headers, index=range(start, start + len(chunk)), dtype=object)
+                    start += len(chunk)
+                    chunk = []
+            
+            if chunk or not start:
+                yield pd.DataFrame(chunk, columns=headers, index=range(start, start + len(chunk)), dtype=object)
+        finally:
+            workbook.close()
+    
+    @staticmethod
+    def _excel_data_rows(rows: Iterable[tuple], width: int) -> Iterator[tuple]:
+        """Fit rows to ``width`` cells, holding blank rows back until a later row shows they are not trailing"""
+        blank_rows = 0
+        for row in rows:
+            if all(cell is None for cell in row):
+                blank_rows += 1
+                continue
+            for _ in range(blank_rows):
+                yield (None,) * width
+            blank_rows = 0
+            row = tuple(row[:width])
+            yield row + (None,) * (width - len(row))
+    
+    @staticmethod
+    def _excel_headers(row) -> List[str]:
+        """Name header cells like pandas: blanks become 'Unnamed: N', repeats get '.N'"""
+        cells = list(row)
+        while cells and cells[-1] is None:
+            cells.pop()
+        
+        headers = []
+        seen = {}
+        for position, cell in enumerate(cells):
+            name = f"Unnamed: {position}" if cell is None else str(cell)
+            if name in seen:
+                seen[name] += 1
+                name = f"{name}.{seen[name]}"
+            else:
+                seen[name] = 0
+            headers.append(name)
+        return headers
+    
     @staticmethod
     def read_file_data(file, file_type: str, max_rows: int = 100) -> Tuple[List[str], List[Dict[str, Any]]]:
         """Read data from uploaded file and return headers and preview data"""
@@ -143,10 +135,14 @@ class FileProcessor:
                 # Reset file pointer
                 file.seek(0)
                 df = pd.read_csv(file, nrows=max_rows)
-            elif file_type == 'excel':
+            elif file_type == 'excel' and FileProcessor.is_legacy_excel(file):
                 # Reset file pointer
                 file.seek(0)
                 df = pd.read_excel(file, nrows=max_rows)
+            elif file_type == 'excel':
+                # Stream only the preview rows instead of loading the workbook
+                with closing(FileProcessor.iter_excel_chunks(file, max_rows)) as chunks:
+                    df = next(chunks).infer_objects()
             else:
                 raise ValueError(f"Unsupported file type: {file_type}")
             
@@ -165,95 +161,205 @@ class FileProcessor:
             raise ValueError(f"Error reading file: {str(e)}")
     
     @staticmethod
-    def process_full_file(file, file_type: str, field_mappings: Dict[str, str], 
-                         target_model: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-        """Process the entire file with field mappings and validation"""
+    def iter_file_chunks(file, file_type: str, chunk_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """Read the file in fixed-size chunks of cleaned rows
+
+        Every chunk keeps the file-wide row position as its index so row
+        numbers stay correct across chunks. CSV cells are read as text so
+        a column's values do not depend on which chunk they land in.
+
+        When the parse cache is enabled, a file whose content has been
+        parsed before is served from the cache instead of being parsed
+        again; otherwise the chunks are cached as they are parsed.
+        """
+        if ParsedFileCache.root() is None:
+            yield from FileProcessor._parse_file_chunks(file, file_type, chunk_size)
+            return
+        
+        cache_key = ParsedFileCache.key_for(file, file_type)
+        cached_chunks = ParsedFileCache.load(cache_key)
+        if cached_chunks is not None:
+            yield from cached_chunks
+        else:
+            yield from ParsedFileCache.store(
+                cache_key, FileProcessor._parse_file_chunks(file, file_type, chunk_size)
+            )
+    
+    @staticmethod
+    def _parse_file_chunks(file, file_type: str, chunk_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """Parse the file into chunks of cleaned rows"""
+        chunk_size = chunk_size or getattr(settings, 'MAPPER_CHUNK_SIZE', 5000)
+        
+        if file_type == 'csv':
+            file.seek(0)
+            # Closing the reader ourselves leaves the file open; a reader
+            # dropped mid-file would close it on garbage collection
+            with pd.read_csv(file, chunksize=chunk_size, dtype=str) as reader:
+                yield from FileProcessor._clean_chunks(reader)
+            return
+        elif file_type == 'excel' and FileProcessor.is_legacy_excel(file):
+            # openpyxl cannot stream .xls, so those are still read in one go
+            file.seek(0)
+            df = pd.read_excel(file, dtype=object)
+            chunks = (df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size))
+        elif file_type == 'excel':
+            chunks = FileProcessor.iter_excel_chunks(file, chunk_size)
+        else:
+            raise ValueError(f"Unsupported file type: {file_type}")
+        
+        yield from FileProcessor._clean_chunks(chunks)
+    
+    @staticmethod
+    def _clean_chunks(chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        for chunk in chunks:
+            # Clean column names
+            chunk.columns = chunk.columns.astype(str).str.strip()
+            yield chunk.where(chunk.notna(), '')
+    
+    @staticmethod
+    def profile_columns(file, file_type: str, max_rows: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """Profile the columns of the file's first ``max_rows`` rows
+
+        ``max_rows`` defaults to ``MAPPER_PROFILE_SAMPLE_ROWS``; 0 profiles
+        the whole file, chunk by chunk.
+        """
+        if max_rows is None:
+            max_rows = getattr(settings, 'MAPPER_PROFILE_SAMPLE_ROWS', 10000)
+        
         try:
-            if file_type == 'csv':
-                file.seek(0)
-                df = pd.read_csv(file)
-            elif file_type == 'excel':
-                file.seek(0)
-                df = pd.read_excel(file)
-            else:
-                raise ValueError(f"Unsupported file type: {file_type}")
+            profiler = ColumnProfiler()
+            if not max_rows:
+                for chunk in FileProcessor.iter_file_chunks(file, file_type):
+                    profiler.add(chunk)
+                return profiler.profiles()
             
-            # Clean column names
-            df.columns = df.columns.astype(str).str.strip()
-            df = df.fillna('')
+            chunk_size = min(getattr(settings, 'MAPPER_CHUNK_SIZE', 5000), max_rows)
+            rows = 0
+            with closing(FileProcessor._parse_file_chunks(file, file_type, chunk_size)) as chunks:
+                for chunk in chunks:
+                    chunk = chunk.iloc[:max_rows - rows]
+                    profiler.add(chunk)
+                    rows += len(chunk)
+                    if rows >= max_rows:
+                        break
+            return profiler.profiles()
             
-            # Get model field information
-            model_fields = ModelIntrospector.get_model_fields(target_model)
+        except Exception as e:
+            raise ValueError(f"Error profiling file: {str(e)}")
+    
+    @staticmethod
+    def process_file_in_chunks(file, file_type: str, field_mappings: Dict[str, str],
+                               target_model: str, sink, chunk_size: Optional[int] = None,
+                               workers: Optional[int] = None,
+                               import_options: Optional[Dict[str, Any]] = None) -> Tuple[int, int]:
+        """Validate the file chunk by chunk into ``sink``, returning the valid and invalid row counts"""
+        try:
+            # Compile the validation rules once for the whole file
+            import_options = import_options or {}
+            plan = ValidationPlan.for_model(target_model, field_mappings, import_options.get('fk_lookups'))
+            uniqueness = FileProcessor.uniqueness_checker(target_model, plan, import_options)
+            workers = workers or getattr(settings, 'MAPPER_PARALLEL_WORKERS', 1)
+            
+            if workers > 1:
+                results = ParallelValidator.iter_results(file, file_type, plan, workers, chunk_size)
+            else:
+                results = (plan.validate_frame_with_rows(chunk)
+                           for chunk in FileProcessor.iter_file_chunks(file, file_type, chunk_size))
             
-            valid_records = []
-            invalid_records = []
+            valid_count = 0
+            invalid_count = 0
             
-            for index, row in df.iterrows():
-                record = {}
-                errors = []
-                
-                # Apply field mappings and validate
-                for csv_field, model_field in field_mappings.items():
-                    if model_field and model_field in model_fields:
-                        value = row.get(csv_field, '')
-                        
-                        is_valid, error_msg, converted_value = ModelIntrospector.validate_field_value(
-                            model_fields[model_field], value
-                        )
-                        
-                        if is_valid:
-                            record[model_field] = converted_value
-                        else:
-                            errors.append({
-                                'field': model_field,
-                                'value': value,
-                                'error': error_msg
-                            })
-                
-                if errors:
-                    invalid_records.append({
-                        'row': index + 1,
-                        'data': dict(row),
-                        'errors': errors
-                    })
-                else:
-                    valid_records.append(record)
+            for valid_records, valid_rows, valid_data, invalid_records in results:
+                valid_records, invalid_records = uniqueness.check(
+                    valid_records, valid_rows, valid_data, invalid_records
+                )
+                sink.write(valid_records, invalid_records)
+                valid_count += len(valid_records)
+                invalid_count += len(invalid_records)
             
-            return valid_records, invalid_records
+            return valid_count, invalid_count
             
         except Exception as e:
             raise ValueError(f"Error processing file: {str(e)}")
+    
+    @staticmethod
+    def uniqueness_checker(target_model: str, plan: ValidationPlan,
+                           import_options: Dict[str, Any]) -> UniquenessChecker:
+        """Build the uniqueness stage for the import mode the session will commit with
+
+        Valid rows whose unique values repeat in the file or already exist
+        in the target table become invalid. With ``import_options['mode']``
+        set to upsert, rows may match existing ones on
+        ``import_options['key_fields']`` (the model's first unique field by
+        default).
+        """
+        from .importer import BulkImporter, IMPORT_MODE_UPSERT
+
+        model = ModelIntrospector.get_all_models()[target_model]
+        key_fields = None
+        if import_options.get('mode') == IMPORT_MODE_UPSERT:
+            key_fields = import_options.get('key_fields') or BulkImporter.default_key_fields(model)
+        return UniquenessChecker(model, plan, key_fields)
+
+    @staticmethod
+    def process_full_file(file, file_type: str, field_mappings: Dict[str, str], 
+                         target_model: str, import_options: Optional[Dict[str, Any]] = None
+                         ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Process the entire file with field mappings and validation"""
+        sink = ListSink()
+        FileProcessor.process_file_in_chunks(file, file_type, field_mappings, target_model, sink,
+                                             import_options=import_options)
+        return sink.valid_records, sink.invalid_records
+
+
+class ListSink:
+    """Result sink that collects every validated row in memory"""
+    
+    def __init__(self):
+        self.valid_records = []
+        self.invalid_records = []
+    
+    def write(self, valid_records: List[Dict[str, Any]], invalid_records: List[Dict[str, Any]]):
+        self.valid_records.extend(valid_records)
+        self.invalid_records.extend(invalid_records)
 
 
 class FieldMapper:
     """Utility class for suggesting and managing field mappings"""
     
     @staticmethod
-    def suggest_mappings(csv_headers: List[str], model_fields: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+    def suggest_mappings(csv_headers: List[str], model_fields: Mapping[str, Mapping[str, Any]],
+                         model_name: Optional[str] = None,
+                         column_profiles: Optional[Mapping[str, Mapping[str, Any]]] = None) -> Dict[str, str]:
         """Suggest field mappings based on field names similarity"""
+        return {
+            csv_header: model_field
+            for csv_header, (model_field, confidence)
+            in FieldMapper.suggest_with_confidence(csv_headers, model_fields, model_name, column_profiles).items()
+        }
+
+    @staticmethod
+    def suggest_with_confidence(csv_headers: List[str], model_fields: Mapping[str, Mapping[str, Any]],
+                                model_name: Optional[str] = None,
+                                column_profiles: Optional[Mapping[str, Mapping[str, Any]]] = None
+                                ) -> Dict[str, Tuple[str, int]]:
+        """Suggested field and 0-100 confidence per header; ``''`` and 0 when nothing matches
+
+        Pass ``model_name`` to start from the choices remembered for that
+        model (confidence 100) and to reuse the registry's cached index of
+        its fields for the other headers. ``column_profiles`` (the upload's
+        stored profiles) weigh the suggestions by the columns' values.
+        """
         suggestions = {}
-        
-        for csv_header in csv_headers:
-            best_match = ""
-            best_score = 0
-            
-            csv_header_clean = csv_header.lower().replace('_', '').replace(' ', '').replace('-', '')
-            
-            for model_field_name, model_field_info in model_fields.items():
-                model_field_clean = model_field_name.lower().replace('_', '').replace(' ', '').replace('-', '')
-                
-                # Exact match
-                if csv_header_clean == model_field_clean:
-                    best_match = model_field_name
-                    break
-                
-                # Partial match
-                if csv_header_clean in model_field_clean or model_field_clean in csv_header_clean:
-                    score = min(len(csv_header_clean), len(model_field_clean)) / max(len(csv_header_clean), len(model_field_clean))
-                    if score > best_score and score > 0.6:  # Only suggest if similarity > 60%
-                        best_match = model_field_name
-                        best_score = score
-            
-            suggestions[csv_header] = best_match
-        
-        return suggestions
+        if model_name:
+            for csv_header, model_field in MappingHistory.recall(model_name, csv_headers).items():
+                # Skip choices of fields the model no longer has
+                if model_field in model_fields:
+                    suggestions[csv_header] = (model_field, 100)
+
+        unseen = [csv_header for csv_header in csv_headers if csv_header not in suggestions]
+        if unseen:
+            matcher = SchemaRegistry.field_matcher(model_name) if model_name else FieldMatcher(model_fields)
+            for csv_header, (model_field, score) in matcher.match_all(unseen, column_profiles).items():
+                suggestions[csv_header] = (model_field, FieldMatcher.confidence(score))
+        return {csv_header: suggestions[csv_header] for csv_header in csv_headers}
@@ -0,0 +1,555 @@
+import re
+import warnings
+from collections import Counter
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+from typing import Dict, List, Any, Tuple, Callable, Optional
+
+from .lookups import ForeignKeyLookup
+
+
+INTEGER_TYPES = ('IntegerField', 'BigIntegerField', 'SmallIntegerField')
+NUMERIC_TYPES = ('FloatField', 'DecimalField')
+TEXT_TYPES = ('CharField', 'TextField')
+DATE_TYPES = ('DateField', 'DateTimeField')
+
+TRUE_VALUES = ('true', '1', 'yes', 'on')
+FALSE_VALUES = ('false', '0', 'no', 'off')
+
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+EMAIL_REGEX = re.compile(EMAIL_PATTERN)
+
+# int(float(...)) is only exact inside the int64 range numpy can hold
+INT64_LIMIT = 2 ** 63
+
+# Distinct values sampled to infer a date column's format, and distinct
+# raw values remembered per date column for cells that do not match it
+DATE_FORMAT_SAMPLE_SIZE = 100
+DATE_CACHE_SIZE = 65536
+
+
+REQUIRED_ERROR = "This field is required"
+
+# Field info keys the compiled rules depend on
+PLAN_FIELD_KEYS = ('type', 'required', 'max_length', 'choices', 'related_model', 'unique')
+
+FOREIGN_KEY_TYPES = ('ForeignKey', 'OneToOneField')
+MANY_TO_MANY_TYPES = ('ManyToManyField',)
+
+# Separates the related values in one many-to-many cell, e.g. "Hostel;Sports"
+MULTI_VALUE_SEPARATOR = ';'
+
+
+def compile_converter(field_info: Dict[str, Any]) -> Callable[[Any], Tuple[bool, str, Any]]:
+    """Build a converter closure for one field definition
+
+    Everything that depends only on the field (type dispatch, max_length,
+    the choice set) is resolved here once; the returned function does the
+    per-value work and returns ``(is_valid, error_msg, converted_value)``.
+    """
+    field_type = field_info.get('type')
+    required = field_info.get('required', True)
+    max_length = field_info.get('max_length')
+    choices = field_info.get('choices')
+    valid_choices = [choice[0] for choice in choices] if choices else None
+    choice_set = frozenset(valid_choices) if valid_choices else frozenset()
+    choice_error = f"Invalid choice. Must be one of: {valid_choices}"
+
+    # Type conversion based on field type
+    if field_type in INTEGER_TYPES:
+        def convert(value):
+            try:
+                return True, "", int(float(str(value)))
+            except (ValueError, TypeError):
+                return False, f"Invalid integer value: {value}", None
+
+    elif field_type in NUMERIC_TYPES:
+        def convert(value):
+            try:
+                return True, "", float(value)
+            except (ValueError, TypeError):
+                return False, f"Invalid numeric value: {value}", None
+
+    elif field_type == 'BooleanField':
+        def convert(value):
+            lowered = str(value).lower()
+            if lowered in TRUE_VALUES:
+                return True, "", True
+            if lowered in FALSE_VALUES:
+                return True, "", False
+            return False, f"Invalid boolean value: {value}", None
+
+    elif field_type in TEXT_TYPES:
+        def convert(value):
+            text = str(value)
+            if max_length and len(text) > max_length:
+                return False, f"Text too long (max {max_length} characters)", None
+            return True, "", text
+
+    elif field_type in DATE_TYPES:
+        def convert(value):
+            try:
+                # Try to parse date/datetime
+                return True, "", pd.to_datetime(value).isoformat()
+            except Exception:
+                return False, f"Invalid date/datetime format: {value}", None
+
+    elif field_type == 'EmailField':
+        def convert(value):
+            if not EMAIL_REGEX.match(str(value)):
+                return False, f"Invalid email format: {value}", None
+            return True, "", str(value)
+
+    else:
+        def convert(value):
+            return True, "", value
+
+    def in_choices(value):
+        try:
+            return value in choice_set
+        except TypeError:
+            return value in valid_choices
+
+    def converter(value):
+        try:
+            if value is None or value == '':
+                if required:
+                    return False, REQUIRED_ERROR, None
+                return True, "", None
+
+            if field_type is None:
+                raise KeyError('type')
+
+            is_valid, error_msg, converted_value = convert(value)
+            if not is_valid:
+                return is_valid, error_msg, converted_value
+
+            # Check choices if available
+            if valid_choices and not in_choices(converted_value):
+                return False, choice_error, None
+
+            return True, "", converted_value
+
+        except Exception as e:
+            return False, f"Validation error: {str(e)}", None
+
+    return converter
+
+
+def memoize_converter(converter: Callable[[Any], Tuple[bool, str, Any]]) -> Callable[[Any], Tuple[bool, str, Any]]:
+    """Remember a converter's result per distinct (hashable) raw value"""
+    cached = lru_cache(maxsize=DATE_CACHE_SIZE, typed=True)(converter)
+
+    def convert(value):
+        try:
+            return cached(value)
+        except TypeError:
+            return converter(value)
+
+    return convert
+
+
+def infer_date_format(samples) -> Optional[str]:
+    """Guess the strftime format most of the sampled date strings share"""
+    formats = Counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for sample in samples[:DATE_FORMAT_SAMPLE_SIZE]:
+            date_format = guess_datetime_format(sample)
+            if date_format:
+                formats[date_format] += 1
+    if not formats:
+        return None
+    return formats.most_common(1)[0][0]
+
+
+def validate_value(field_info: Dict[str, Any], value: Any) -> Tuple[bool, str, Any]:
+    """Validate a single value against a field definition"""
+    return compile_converter(field_info)(value)
+
+
+class ColumnRule:
+    """A mapped column with its field settings resolved up front"""
+
+    def __init__(self, csv_field: str, model_field: str, field_info: Dict[str, Any],
+                 lookup_field: Optional[str] = None):
+        self.csv_field = csv_field
+        self.model_field = model_field
+        self.field_info = field_info
+        self.field_type = field_info.get('type')
+        self.required = field_info.get('required', True)
+        self.max_length = field_info.get('max_length')
+        choices = field_info.get('choices')
+        self.valid_choices = [choice[0] for choice in choices] if choices else None
+        self.convert = compile_converter(field_info)
+
+        # Date columns infer their format once and reuse parsed values
+        self.date_format = None
+        self.date_format_inferred = False
+        if self.field_type in DATE_TYPES:
+            self.convert = memoize_converter(self.convert)
+
+        # Relation columns resolve their values to related primary keys;
+        # many-to-many cells hold several values and convert to a pk list
+        self.lookup = None
+        self.many = False
+        if field_info.get('related_model'):
+            if self.field_type in FOREIGN_KEY_TYPES:
+                self.lookup = ForeignKeyLookup(field_info['related_model'], lookup_field)
+                self.convert = self._with_lookup(self.convert)
+            elif self.field_type in MANY_TO_MANY_TYPES:
+                self.lookup = ForeignKeyLookup(field_info['related_model'], lookup_field)
+                self.many = True
+                self.convert = self._with_many_lookup(self.convert)
+
+    def _with_lookup(self, convert: Callable[[Any], Tuple[bool, str, Any]]) -> Callable[[Any], Tuple[bool, str, Any]]:
+        def convert_related(value):
+            is_valid, error_msg, converted_value = convert(value)
+            if not is_valid or converted_value is None:
+                return is_valid, error_msg, converted_value
+            pk = self.lookup.resolve([converted_value])[converted_value]
+            if pk is None:
+                return False, self.lookup.error_message(value), None
+            return True, "", pk
+        return convert_related
+
+    def _with_many_lookup(self, convert: Callable[[Any], Tuple[bool, str, Any]]) -> Callable[[Any], Tuple[bool, str, Any]]:
+        def convert_related_many(value):
+            is_valid, error_msg, converted_value = convert(value)
+            if not is_valid or converted_value is None:
+                return is_valid, error_msg, converted_value
+            names = self.split_values(converted_value)
+            resolved = self.lookup.resolve(names)
+            unknown = [str(name) for name in names if resolved[name] is None]
+            if unknown:
+                return False, self.lookup.error_message(', '.join(unknown)), None
+            return True, "", list(dict.fromkeys(resolved[name] for name in names))
+        return convert_related_many
+
+    @staticmethod
+    def split_values(value: Any) -> List[Any]:
+        """The separate related values of a many-to-many cell"""
+        if not isinstance(value, str):
+            return [value]
+        return [part.strip() for part in value.split(MULTI_VALUE_SEPARATOR) if part.strip()]
+
+    def infer_date_format(self, samples) -> Optional[str]:
+        """Infer the column's date format from the first non-empty sample"""
+        if not self.date_format_inferred and len(samples):
+            self.date_format = infer_date_format(samples)
+            self.date_format_inferred = True
+        return self.date_format
+
+
+class ValidationPlan:
+    """Validation rules compiled once per target model and field mappings
+
+    Build one plan per import (or per API request) and run every row or
+    chunk through it; validating a cell is then a single call to the
+    column's converter.
+    """
+
+    def __init__(self, field_mappings: Dict[str, str], model_fields: Dict[str, Dict[str, Any]],
+                 fk_lookups: Optional[Dict[str, str]] = None,
+                 date_formats: Optional[Dict[str, Optional[str]]] = None):
+        self.field_mappings = dict(field_mappings)
+        self.fk_lookups = dict(fk_lookups or {})
+        self.rules = [
+            ColumnRule(csv_field, model_field, model_fields[model_field], self.fk_lookups.get(model_field))
+            for csv_field, model_field in field_mappings.items()
+            if model_field and model_field in model_fields
+        ]
+        for rule in self.rules:
+            if date_formats and rule.csv_field in date_formats:
+                rule.date_format = date_formats[rule.csv_field]
+                rule.date_format_inferred = True
+
+    def __reduce__(self):
+        # Converters are closures, so ship the field settings they are
+        # built from and compile them again on the other side, along with
+        # the date formats inferred so far
+        model_fields = {
+            rule.model_field: {key: rule.field_info.get(key) for key in PLAN_FIELD_KEYS if key in rule.field_info}
+            for rule in self.rules
+        }
+        date_formats = {rule.csv_field: rule.date_format for rule in self.rules if rule.date_format_inferred}
+        return ValidationPlan, (self.field_mappings, model_fields, self.fk_lookups, date_formats)
+
+    @classmethod
+    def for_model(cls, target_model: str, field_mappings: Dict[str, str],
+                  fk_lookups: Optional[Dict[str, str]] = None) -> 'ValidationPlan':
+        """Build a plan from the target model's current field information
+
+        ``fk_lookups`` (``import_options['fk_lookups']`` of an upload)
+        maps relation fields to the related model field their column
+        values are matched on.
+        """
+        from .utils import ModelIntrospector
+        return cls(field_mappings, ModelIntrospector.get_model_fields(target_model), fk_lookups)
+
+    @property
+    def date_rules(self) -> List[ColumnRule]:
+        """Rules of the mapped date and datetime columns"""
+        return [rule for rule in self.rules if rule.field_type in DATE_TYPES]
+
+    def infer_date_formats(self, df: pd.DataFrame):
+        """Infer the date columns' formats from a frame, as validating it would"""
+        for rule in self.date_rules:
+            if rule.csv_field in df:
+                values = df[rule.csv_field]
+                values = values[~(values.isna() | (values == ''))]
+                rule.infer_date_format(ColumnValidator.distinct_text(values)[1])
+
+    def validate_row(self, row: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """Validate one row and return the converted record and its errors"""
+        record = {}
+        errors = []
+        for rule in self.rules:
+            value = row.get(rule.csv_field, '')
+            is_valid, error_msg, converted_value = rule.convert(value)
+            if is_valid:
+                record[rule.model_field] = converted_value
+            else:
+                errors.append({
+                    'field': rule.model_field,
+                    'value': value,
+                    'error': error_msg
+                })
+        return record, errors
+
+    def validate_frame(self, df: pd.DataFrame) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Validate a frame of rows column by column"""
+        valid_records, _, _, invalid_records = ColumnValidator.validate_frame(df, self)
+        return valid_records, invalid_records
+
+    def validate_frame_with_rows(self, df: pd.DataFrame
+                                 ) -> Tuple[List[Dict[str, Any]], List[int], pd.DataFrame, List[Dict[str, Any]]]:
+        """Validate a frame of rows, also returning the row number and raw row of each valid record"""
+        return ColumnValidator.validate_frame(df, self)
+
+
+class ColumnValidator:
+    """Validates whole mapped columns at once with pandas operations
+
+    Cells the vectorized checks accept are converted in bulk. Cells they
+    reject (and every cell of a type without a vectorized path) go through
+    the column's converter so the error messages match the per-cell
+    validator exactly.
+    """
+
+    @staticmethod
+    def validate_column(rule: ColumnRule, series: pd.Series) -> Tuple[pd.Series, pd.Series]:
+        """Return the converted values and the error message (or None) of each cell"""
+        converted = pd.Series([None] * len(series), index=series.index, dtype=object)
+        errors = pd.Series([None] * len(series), index=series.index, dtype=object)
+
+        try:
+            empty = (series.isna() | (series == '')).to_numpy(dtype=bool)
+        except Exception:
+            return ColumnValidator._validate_cells(rule, series, converted, errors)
+
+        if rule.required:
+            errors[empty] = REQUIRED_ERROR
+
+        values = series[~empty]
+        if values.empty:
+            return converted, errors
+
+        try:
+            accepted, values_converted, rejected = ColumnValidator._convert(rule, values)
+        except Exception:
+            return ColumnValidator._validate_cells(rule, values, converted, errors)
+
+        # Check choices if available
+        if rule.valid_choices and len(values_converted):
+            in_choices = values_converted.isin(rule.valid_choices)
+            errors[in_choices[~in_choices].index] = f"Invalid choice. Must be one of: {rule.valid_choices}"
+            values_converted = values_converted[in_choices]
+
+        # Resolve relation values with one lookup for the column's distinct values
+        if rule.lookup and len(values_converted):
+            resolved = rule.lookup.resolve(pd.unique(values_converted.to_numpy()))
+            related = pd.Series([resolved[value] for value in values_converted],
+                                index=values_converted.index, dtype=object)
+            unknown = related.isna().to_numpy()
+            for index in values_converted.index[unknown]:
+                errors[index] = rule.lookup.error_message(values[index])
+            values_converted = related[~unknown].astype(object)
+
+        converted[values_converted.index] = values_converted
+        for message, index in rejected:
+            errors[index] = message
+
+        return ColumnValidator._validate_cells(rule, values[~accepted], converted, errors)
+
+    @staticmethod
+    def _convert(rule: ColumnRule, values: pd.Series) -> Tuple[np.ndarray, pd.Series, List[Tuple[str, pd.Index]]]:
+        """Convert non-empty cells in bulk
+
+        Returns a mask of the cells handled here, the converted values of
+        the cells that passed, and ``(message, index)`` pairs for cells
+        that failed with a known message.
+        """
+        field_type = rule.field_type
+        rejected = []
+
+        if rule.many:
+            return ColumnValidator._convert_many(rule, values)
+
+        if field_type in INTEGER_TYPES or field_type in NUMERIC_TYPES:
+            text = values.astype(str)
+            numbers = pd.to_numeric(text, errors='coerce').astype(float)
+            accepted = np.isfinite(numbers.to_numpy())
+            # pandas' fast parser can be off by an ulp on long digit strings;
+            # reparse the accepted cells exactly, as float() would
+            numbers = pd.Series(text[accepted].to_numpy().astype(float), index=text.index[accepted])
+            accepted[accepted] = np.isfinite(numbers.to_numpy())
+            if field_type in INTEGER_TYPES:
+                in_range = np.abs(numbers.to_numpy()) < INT64_LIMIT
+                accepted[accepted] = in_range
+                numbers = numbers[in_range]
+                converted = pd.Series(np.trunc(numbers.to_numpy()).astype(np.int64).tolist(),
+                                      index=numbers.index, dtype=object)
+            else:
+                converted = pd.Series(numbers.tolist(), index=numbers.index, dtype=object)
+            return accepted, converted, rejected
+
+        if field_type == 'BooleanField':
+            lowered = values.astype(str).str.lower()
+            mapped = lowered.map({**{v: True for v in TRUE_VALUES}, **{v: False for v in FALSE_VALUES}})
+            accepted = mapped.notna().to_numpy()
+            return accepted, mapped[accepted].astype(object), rejected
+
+        if field_type in TEXT_TYPES:
+            text = values.astype(str)
+            accepted = np.ones(len(values), dtype=bool)
+            if rule.max_length:
+                too_long = (text.str.len() > rule.max_length).to_numpy()
+                rejected.append((f"Text too long (max {rule.max_length} characters)", text.index[too_long]))
+                text = text[~too_long]
+            return accepted, text.astype(object), rejected
+
+        if field_type in DATE_TYPES:
+            return ColumnValidator._convert_dates(rule, values)
+
+        if field_type == 'EmailField':
+            text = values.astype(str)
+            accepted = np.ones(len(values), dtype=bool)
+            matches = text.str.match(EMAIL_PATTERN).to_numpy(dtype=bool)
+            for index in text.index[~matches]:
+                rejected.append((f"Invalid email format: {values[index]}", [index]))
+            return accepted, text[matches].astype(object), rejected
+
+        return np.ones(len(values), dtype=bool), values.astype(object), rejected
+
+    @staticmethod
+    def _convert_many(rule: ColumnRule, values: pd.Series) -> Tuple[np.ndarray, pd.Series, List[Tuple[str, pd.Index]]]:
+        """Look up the distinct related values of a many-to-many column at once
+
+        The cells themselves are left to the column's converter, which then
+        finds every value in the lookup cache.
+        """
+        rule.lookup.resolve({name for value in values for name in rule.split_values(value)})
+        return np.zeros(len(values), dtype=bool), pd.Series(dtype=object), []
+
+    @staticmethod
+    def distinct_text(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """Mask of the string cells and their distinct values, in order of appearance"""
+        is_text = values.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool)
+        return is_text, pd.unique(values[is_text].to_numpy())
+
+    @staticmethod
+    def _convert_dates(rule: ColumnRule, values: pd.Series) -> Tuple[np.ndarray, pd.Series, List[Tuple[str, pd.Index]]]:
+        """Parse the distinct date strings of a column with its inferred format
+
+        Strings that do not match the format, and non-string cells, are
+        left to the column's memoized converter.
+        """
+        is_text, distinct = ColumnValidator.distinct_text(values)
+        text = values[is_text]
+        date_format = rule.infer_date_format(distinct)
+
+        parsed_values = {}
+        if date_format and len(distinct):
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                parsed = pd.to_datetime(pd.Series(distinct), format=date_format, errors='coerce')
+            if pd.api.types.is_datetime64_any_dtype(parsed):
+                matched = parsed.notna().to_numpy()
+                for raw, timestamp in zip(distinct[matched], parsed[matched]):
+                    parsed_values[raw] = timestamp.isoformat()
+
+        iso_values = text.map(parsed_values)
+        matched = iso_values.notna()
+        accepted = np.zeros(len(values), dtype=bool)
+        accepted[np.flatnonzero(is_text)[matched.to_numpy()]] = True
+        return accepted, iso_values[matched].astype(object), []
+
+    @staticmethod
+    def _validate_cells(rule: ColumnRule, values: pd.Series,
+                        converted: pd.Series, errors: pd.Series) -> Tuple[pd.Series, pd.Series]:
+        """Fall back to the column's converter for the given cells"""
+        for index, value in values.items():
+            is_valid, error_msg, converted_value = rule.convert(value)
+            if is_valid:
+                converted[index] = converted_value
+            else:
+                errors[index] = error_msg
+        return converted, errors
+
+    @staticmethod
+    def validate_frame(df: pd.DataFrame, plan: ValidationPlan
+                       ) -> Tuple[List[Dict[str, Any]], List[int], pd.DataFrame, List[Dict[str, Any]]]:
+        """Run a validation plan over a frame of rows column by column
+
+        Returns the valid records, their row numbers, their raw rows as a
+        frame and the invalid records.
+        """
+        converted_columns = {}
+        checked_columns = []
+
+        for rule in plan.rules:
+            if rule.csv_field in df.columns:
+                raw = df[rule.csv_field]
+            else:
+                raw = pd.Series('', index=df.index, dtype=object)
+
+            converted, errors = ColumnValidator.validate_column(rule, raw)
+            converted_columns[rule.model_field] = converted
+            checked_columns.append((rule.model_field, raw, errors))
+
+        # Per-row error mask
+        has_errors = np.zeros(len(df), dtype=bool)
+        for _, _, errors in checked_columns:
+            has_errors |= errors.notna().to_numpy()
+
+        if converted_columns:
+            valid_records = pd.DataFrame(converted_columns)[~has_errors].to_dict('records')
+        else:
+            valid_records = [{} for _ in range(int((~has_errors).sum()))]
+
+        valid_rows = (df.index[~has_errors].to_numpy(dtype=np.int64) + 1).tolist()
+        valid_data = df[~has_errors]
+
+        invalid_positions = np.flatnonzero(has_errors)
+        invalid_data = df.iloc[invalid_positions].to_dict('records')
+        invalid_records = []
+        for position, data in zip(invalid_positions, invalid_data):
+            row_errors = []
+            for model_field, raw, errors in checked_columns:
+                error_msg = errors.iat[position]
+                if error_msg is not None:
+                    row_errors.append({
+                        'field': model_field,
+                        'value': raw.iat[position],
+                        'error': error_msg
+                    })
+            invalid_records.append({
+                'row': int(df.index[position]) + 1,
+                'data': data,
+                'errors': row_errors
+            })
+
+        return valid_records, valid_rows, valid_data, invalid_records
@@ -1,53 +1,70 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.contrib import messages
 import json
 import io
 
-from .models import UploadSession
-from .utils import ModelIntrospector, FileProcessor, FieldMapper
+from .models import UploadSession, SessionResultChunk, MappingProfile
+from .utils import ModelIntrospector, FieldMapper
+from .importer import BulkImporter, IMPORT_MODE_INSERT
+from .result_store import ResultStore
+from .workflow import UploadWorkflow
+from .schema_registry import SchemaRegistry
+from .exports import ResultExporter, EXPORT_FORMATS, CONTENT_TYPES, ERROR_CSV_COLUMNS
+
+
+# Records shown per page of the results previews
+RESULTS_PAGE_SIZE = 10
 
 
 def index(request):
     """Home page with file upload form"""
-    return render(request, 'mapper/index.html')
+    context = {
+        'profiles': MappingProfile.objects.only('id', 'name', 'target_model')
+    }
+    return render(request, 'mapper/index.html', context)
 
 
 @require_http_methods(["POST"])
 def upload_file(request):
-    """Handle file upload and initial processing"""
+    """Handle file upload and initial processing
+    
+    With a ``profile``, the saved mappings are applied and the file is
+    processed right away instead of going through model selection and
+    field mapping.
+    """
     try:
         if 'file' not in request.FILES:
             messages.error(request, 'No file selected.')
             return redirect('index')
         
-        uploaded_file = request.FILES['file']
+        profile = None
+        if request.POST.get('profile'):
+            profile = MappingProfile.objects.filter(id=request.POST['profile']).first()
+            if profile is None:
+                messages.error(request, 'The selected mapping profile no longer exists.')
+                return redirect('index')
         
-        # Detect file type
+        # Detect the file type, read the preview and create the session
         try:
-            file_type = FileProcessor.detect_file_type(uploaded_file)
+            session = UploadWorkflow.start(request.FILES['file'])
         except ValueError as e:
             messages.error(request, str(e))
             return redirect('index')
         
-        # Read file preview data
+        if profile is None:
+            return redirect('model_selection', session_id=session.id)
+        
+        UploadWorkflow.apply_profile(session, profile)
         try:
-            headers, preview_data = FileProcessor.read_file_data(uploaded_file, file_type, max_rows=10)
+            UploadWorkflow.process(session)
         except ValueError as e:
-            messages.error(request, str(e))
-            return redirect('index')
+            messages.error(request, f'Error processing file: {str(e)}')
+            return redirect('field_mapping', session_id=session.id)
         
-        # Create upload session
-        session = UploadSession.objects.create(
-            file=uploaded_file,
-            original_filename=uploaded_file.name,
-            file_type=file_type,
-            preview_data=preview_data
-        )
-        
-        return redirect('model_selection', session_id=session.id)
+        return redirect('results', session_id=session.id)
         
     except Exception as e:
         messages.error(request, f'Error processing file: {str(e)}')
@@ -56,21 +73,16 @@ def upload_file(request):
 
 def model_selection(request, session_id):
     """Show model selection page"""
-    session = get_object_or_404(UploadSession, id=session_id)
-    
-    # Get all available models
-    all_models = ModelIntrospector.get_all_models()
+    session = get_object_or_404(UploadSession.objects.with_payloads('preview_data'), id=session_id)
     
-    # Filter out system models and focus on user models
+    # Offer only the models uploads may be imported into
     user_models = {}
-    for model_name, model_class in all_models.items():
-        app_label = model_class._meta.app_label
-        if app_label not in ['admin', 'auth', 'contenttypes', 'sessions', 'messages']:
-            user_models[model_name] = {
-                'name': model_name,
-                'verbose_name': model_class._meta.verbose_name,
-                'app_label': app_label
-            }
+    for model_name, model_class in SchemaRegistry.import_targets().items():
+        user_models[model_name] = {
+            'name': model_name,
+            'verbose_name': model_class._meta.verbose_name,
+            'app_label': model_class._meta.app_label
+        }
     
     context = {
         'session': session,
@@ -84,22 +96,25 @@ def model_selection(request, session_id):
 @require_http_methods(["POST"])
 def select_model(request, session_id):
     """Handle model selection and redirect to field mapping"""
-    session = get_object_or_404(UploadSession, id=session_id)
+    session = get_object_or_404(UploadSession.objects.only('id', 'target_model'), id=session_id)
     
     target_model = request.POST.get('target_model')
     if not target_model:
         messages.error(request, 'Please select a target model.')
         return redirect('model_selection', session_id=session_id)
+    if target_model not in SchemaRegistry.import_targets():
+        messages.error(request, f'Cannot import into {target_model}.')
+        return redirect('model_selection', session_id=session_id)
     
     session.target_model = target_model
-    session.save()
+    session.save(update_fields=['target_model', 'updated_at'])
     
     return redirect('field_mapping', session_id=session_id)
 
 
 def field_mapping(request, session_id):
     """Show field mapping interface"""
-    session = get_object_or_404(UploadSession, id=session_id)
+    session = get_object_or_404(UploadSession.objects.with_payloads('preview_data'), id=session_id)
     
     if not session.target_model:
         messages.error(request, 'Please select a target model first.')
@@ -109,16 +124,16 @@ def field_mapping(request, session_id):
     model_fields = ModelIntrospector.get_model_fields(session.target_model)
     
     # Get CSV headers from preview data
-    csv_headers = []
-    if session.preview_data:
-        csv_headers = list(session.preview_data[0].keys()) if session.preview_data else []
+    csv_headers = UploadWorkflow.headers(session)
     
     # Get or create field mappings
     if not session.field_mappings:
         # Suggest initial mappings
-        suggested_mappings = FieldMapper.suggest_mappings(csv_headers, model_fields)
+        suggested_mappings = FieldMapper.suggest_mappings(
+            csv_headers, model_fields, session.target_model, session.column_profiles
+        )
         session.field_mappings = suggested_mappings
-        session.save()
+        session.save(update_fields=['field_mappings', 'updated_at'])
     
     context = {
         'session': session,
@@ -134,7 +149,7 @@ def field_mapping(request, session_id):
 @require_http_methods(["POST"])
 def update_mapping(request, session_id):
     """Update field mappings via AJAX"""
-    session = get_object_or_404(UploadSession, id=session_id)
+    session = get_object_or_404(UploadSession.objects.only('id', 'field_mappings'), id=session_id)
     
     try:
         data = json.loads(request.body)
@@ -146,7 +161,7 @@ def update_mapping(request, session_id):
                 session.field_mappings = {}
             
             session.field_mappings[csv_field] = model_field
-            session.save()
+            session.save(update_fields=['field_mappings', 'updated_at'])
             
             return JsonResponse({'success': True})
         else:
@@ -156,28 +171,70 @@ def update_mapping(request, session_id):
         return JsonResponse({'success': False, 'error': str(e)})
 
 
+@require_http_methods(["POST"])
+def update_mappings(request, session_id):
+    """Apply several mapping changes via AJAX in one request
+    
+    The body is ``{"mappings": {csv_field: model_field, ...}}`` with only
+    the changed columns; an empty model field unmaps the column. Only the
+    mappings and the timestamp are written back.
+    """
+    session = get_object_or_404(UploadSession.objects.only('id', 'field_mappings'), id=session_id)
+    
+    try:
+        data = json.loads(request.body)
+        changes = data.get('mappings')
+        
+        if not isinstance(changes, dict) or not changes:
+            return JsonResponse({'success': False, 'error': 'Missing mappings'})
+        if not all(isinstance(model_field, str) or model_field is None for model_field in changes.values()):
+            return JsonResponse({'success': False, 'error': 'Model fields must be strings'})
+        
+        session.field_mappings = {
+            **(session.field_mappings or {}),
+            **{csv_field: model_field or '' for csv_field, model_field in changes.items()}
+        }
+        session.save(update_fields=['field_mappings', 'updated_at'])
+        
+        return JsonResponse({'success': True, 'updated': len(changes)})
+            
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
+
 @require_http_methods(["POST"])
 def process_file(request, session_id):
     """Process the entire file with current mappings"""
-    session = get_object_or_404(UploadSession, id=session_id)
+    session = get_object_or_404(
+        UploadSession.objects.only(
+            'id', 'file', 'file_type', 'target_model', 'field_mappings', 'import_options',
+            'import_status', 'imported_count'
+        ),
+        id=session_id
+    )
     
     if not session.target_model or not session.field_mappings:
         messages.error(request, 'Please complete the field mapping first.')
         return redirect('field_mapping', session_id=session_id)
     
+    # Duplicate checks depend on how the rows will be imported, so the
+    # import mode is chosen before processing
+    if 'mode' in request.POST:
+        mode = request.POST.get('mode', IMPORT_MODE_INSERT)
+        key_fields = [name.strip() for name in request.POST.get('key_fields', '').split(',') if name.strip()]
+        try:
+            model = SchemaRegistry.import_targets().get(session.target_model)
+            if model is None:
+                raise ValueError(f'Cannot import into {session.target_model}')
+            BulkImporter.key_fields_for(model, mode, key_fields)
+        except ValueError as e:
+            messages.error(request, f'Invalid import options: {str(e)}')
+            return redirect('field_mapping', session_id=session_id)
+        session.import_options = {**(session.import_options or {}), 'mode': mode, 'key_fields': key_fields}
+    
     try:
-        # Process the entire file
-        valid_records, invalid_records = FileProcessor.process_full_file(
-            session.file,
-            session.file_type,
-            session.field_mappings,
-            session.target_model
-        )
-        
-        # Save processed data
-        session.processed_data = valid_records
-        session.validation_errors = invalid_records
-        session.save()
+        session.save(update_fields=['import_options', 'updated_at'])
+        UploadWorkflow.process(session)
         
         return redirect('results', session_id=session_id)
         
@@ -186,52 +243,119 @@ def process_file(request, session_id):
         return redirect('field_mapping', session_id=session_id)
 
 
+@require_http_methods(["POST"])
+def save_profile(request, session_id):
+    """Save the session's model, mappings and import options as a named profile"""
+    session = get_object_or_404(
+        UploadSession.objects.only('id', 'target_model', 'field_mappings', 'import_options'), id=session_id
+    )
+    
+    name = request.POST.get('name', '').strip()
+    if not name:
+        messages.error(request, 'Please enter a profile name.')
+    elif not session.target_model or not session.field_mappings:
+        messages.error(request, 'Please complete the field mapping first.')
+    else:
+        profile = UploadWorkflow.save_profile(session, name)
+        messages.success(request, f'Saved mapping profile "{profile.name}".')
+    
+    return redirect('results', session_id=session_id)
+
+
 def results(request, session_id):
-    """Show processing results"""
-    session = get_object_or_404(UploadSession, id=session_id)
+    """Show processing results
+    
+    Only the stored counts and the first page of each kind are loaded;
+    further pages are fetched from the results API.
+    """
+    session = get_object_or_404(UploadSession.objects.defer('field_mappings'), id=session_id)
     
     context = {
         'session': session,
-        'valid_count': len(session.processed_data),
-        'invalid_count': len(session.validation_errors),
-        'preview_valid': session.processed_data[:10] if session.processed_data else [],
-        'preview_invalid': session.validation_errors[:10] if session.validation_errors else []
+        'valid_count': session.valid_count,
+        'invalid_count': session.invalid_count,
+        'page_size': RESULTS_PAGE_SIZE,
+        'preview_valid': ResultStore.page(session, SessionResultChunk.VALID, 0, RESULTS_PAGE_SIZE),
+        'preview_invalid': ResultStore.page(session, SessionResultChunk.INVALID, 0, RESULTS_PAGE_SIZE)
     }
     
     return render(request, 'mapper/results.html', context)
 
 
-def download_json(request, session_id):
-    """Download processed data as JSON"""
+@require_http_methods(["POST"])
+def commit_import(request, session_id):
+    """Write the processed valid records into the target model"""
     session = get_object_or_404(UploadSession, id=session_id)
     
-    if not session.processed_data:
-        messages.error(request, 'No processed data available for download.')
+    if not session.valid_count:
+        messages.error(request, 'No processed data available to import.')
+        return redirect('results', session_id=session_id)
+    if session.import_status in (UploadSession.IMPORT_RUNNING, UploadSession.IMPORT_COMPLETED):
+        messages.error(request, 'This session is being imported or has been imported already.')
         return redirect('results', session_id=session_id)
     
-    # Create JSON response
-    json_data = json.dumps(session.processed_data, indent=2, ensure_ascii=False)
+    try:
+        imported_count = BulkImporter.commit_session(session)
+        messages.success(request, f'Imported {imported_count} records into {session.target_model}.')
+    except ValueError as e:
+        messages.error(request, f'Import stopped after {session.imported_count} records: {str(e)}')
     
-    response = HttpResponse(json_data, content_type='application/json')
-    filename = f"{session.original_filename.rsplit('.', 1)[0]}_processed.json"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return redirect('results', session_id=session_id)
+
+
+def download_json(request, session_id):
+    """Download processed data as JSON, NDJSON or CSV"""
+    session = get_object_or_404(UploadSession, id=session_id)
     
-    return response
+    if not session.valid_count:
+        messages.error(request, 'No processed data available for download.')
+        return redirect('results', session_id=session_id)
+    
+    return _results_download(request, session, SessionResultChunk.VALID, 'processed')
 
 
 def download_errors(request, session_id):
-    """Download validation errors as JSON"""
+    """Download validation errors as JSON, NDJSON or CSV"""
     session = get_object_or_404(UploadSession, id=session_id)
     
-    if not session.validation_errors:
+    if not session.invalid_count:
         messages.error(request, 'No validation errors available for download.')
         return redirect('results', session_id=session_id)
     
-    # Create JSON response
-    json_data = json.dumps(session.validation_errors, indent=2, ensure_ascii=False)
+    return _results_download(request, session, SessionResultChunk.INVALID, 'errors')
+
+
+def _results_download(request, session, kind, suffix):
+    """Stream stored results as a file
+    
+    ``?format=`` picks json (default), ndjson or csv; ``?pretty=1``
+    indents JSON and ``?gzip=1`` compresses the stream.
+    """
+    export_format = request.GET.get('format', 'json')
+    if export_format not in EXPORT_FORMATS:
+        messages.error(request, f'Unknown export format: {export_format}')
+        return redirect('results', session_id=session.id)
+    
+    records = ResultStore.iter_records(session, kind)
+    if export_format == 'csv':
+        if kind == SessionResultChunk.VALID:
+            columns = list(dict.fromkeys(field for field in session.field_mappings.values() if field))
+            content = ResultExporter.iter_csv(columns, ResultExporter.valid_rows(records, columns))
+        else:
+            content = ResultExporter.iter_csv(ERROR_CSV_COLUMNS, ResultExporter.error_rows(records))
+    elif export_format == 'ndjson':
+        content = ResultExporter.iter_ndjson(records)
+    else:
+        content = ResultExporter.iter_json(records, 2 if request.GET.get('pretty') else None)
+    
+    filename = f"{session.original_filename.rsplit('.', 1)[0]}_{suffix}.{export_format}"
+    content_type = CONTENT_TYPES[export_format]
+    if request.GET.get('gzip'):
+        content = ResultExporter.gzip(content)
+        filename += '.gz'
+        content_type = 'application/gzip'
     
-    response = HttpResponse(json_data, content_type='application/json')
-    filename = f"{session.original_filename.rsplit('.', 1)[0]}_errors.json"
+    response = StreamingHttpResponse(content, content_type=content_type)
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
     
     return response
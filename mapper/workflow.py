@@ -0,0 +1,121 @@
+from typing import List
+
+from .models import MappingProfile, UploadSession
+from .result_store import ResultStore, ResultSink
+from .schema_registry import SchemaRegistry
+from .utils import FileProcessor
+
+
+class UploadWorkflow:
+    """The steps of an upload session, shared by the web views and the API
+
+    ``start`` creates the session from an uploaded file, ``apply_profile``
+    fills in a saved target model, mappings and import options, and
+    ``process`` validates the whole file into the session's results.
+    Each step raises ValueError with a message fit for the user.
+    """
+
+    @staticmethod
+    def start(uploaded_file) -> UploadSession:
+        """Create a session for an uploaded file with its preview and column profiles"""
+        file_type = FileProcessor.detect_file_type(uploaded_file)
+        headers, preview_data = FileProcessor.read_file_data(uploaded_file, file_type, max_rows=10)
+
+        # Profile the columns once; suggestions and mapping checks reuse it
+        try:
+            column_profiles = FileProcessor.profile_columns(uploaded_file, file_type)
+        except ValueError:
+            # Profiles only refine suggestions, so the upload goes ahead without them
+            column_profiles = {}
+
+        return UploadSession.objects.create(
+            file=uploaded_file,
+            original_filename=uploaded_file.name,
+            file_type=file_type,
+            preview_data=preview_data,
+            column_profiles=column_profiles
+        )
+
+    @staticmethod
+    def headers(session: UploadSession) -> List[str]:
+        """Column headers of the session's file"""
+        if session.preview_data:
+            return list(session.preview_data[0].keys())
+        return list(session.column_profiles or {})
+
+    @staticmethod
+    def apply_profile(session: UploadSession, profile: MappingProfile):
+        """Take the profile's target model, mappings and import options
+
+        Only the profile's mappings for columns the file has are used;
+        other columns stay unmapped.
+        """
+        session.target_model = profile.target_model
+        session.field_mappings = {
+            header: profile.field_mappings.get(header, '') for header in UploadWorkflow.headers(session)
+        }
+        session.import_options = dict(profile.import_options or {})
+        session.save(update_fields=['target_model', 'field_mappings', 'import_options', 'updated_at'])
+
+    @staticmethod
+    def save_profile(session: UploadSession, name: str) -> MappingProfile:
+        """Store the session's target model, mappings and import options under a name"""
+        profile, created = MappingProfile.objects.update_or_create(
+            name=name,
+            defaults={
+                'target_model': session.target_model,
+                'field_mappings': {header: field for header, field in session.field_mappings.items() if field},
+                'import_options': session.import_options or {},
+            }
+        )
+        return profile
+
+    @staticmethod
+    def check_mappings(target_model: str, field_mappings):
+        """Raise ValueError unless a column is mapped to every required field
+
+        Required fields with a default may stay unmapped, but at least one
+        column has to be mapped.
+        """
+        model = SchemaRegistry.all_models().get(target_model)
+        if model is None:
+            raise ValueError(f'Model {target_model} not found')
+        mapped = {model_field for model_field in field_mappings.values() if model_field}
+        if not mapped:
+            raise ValueError('No column is mapped to a field of the target model.')
+
+        fields_info = SchemaRegistry.model_fields(target_model)
+        missing = [
+            field.name for field in model._meta.concrete_fields
+            if fields_info[field.name]['required'] and not field.has_default() and not field.primary_key
+            and field.name not in mapped
+        ]
+        if missing:
+            raise ValueError(f"Required fields are not mapped: {', '.join(missing)}")
+
+    @staticmethod
+    def process(session: UploadSession):
+        """Validate the whole file and store the results on the session"""
+        if not session.target_model or not session.field_mappings:
+            raise ValueError('Please complete the field mapping first.')
+        # A failed import resumes from its stored results, so they must not change
+        if session.import_status == UploadSession.IMPORT_RUNNING or session.imported_count:
+            raise ValueError('Records of this session were imported already; upload the file again to start over.')
+        UploadWorkflow.check_mappings(session.target_model, session.field_mappings)
+
+        ResultStore.clear(session)
+        try:
+            # Process the entire file, storing results chunk by chunk
+            sink = ResultSink(session)
+            FileProcessor.process_file_in_chunks(
+                session.file,
+                session.file_type,
+                session.field_mappings,
+                session.target_model,
+                sink,
+                import_options=session.import_options
+            )
+            sink.close()
+        except Exception:
+            ResultStore.clear(session)
+            raise